@@ -48,9 +48,10 @@ from kineticstoolkit.tools import start_lab_mode  # noqa
 from kineticstoolkit.player import Player  # noqa
 listing.append('Player')
 
-from kineticstoolkit.loadsave import load, save  # noqa
+from kineticstoolkit.loadsave import load, save, load_many  # noqa
 listing.append('load')
 listing.append('save')
+listing.append('load_many')
 
 from kineticstoolkit import filters  # noqa
 listing.append('filters')
@@ -40,6 +40,10 @@ def __dir__() -> List[str]:
         'is_mac',
         'is_linux',
         'temp_folder',
+        'cache_enabled',
+        'cache_folder',
+        'cache_size',
+        'copy_on_write',
         'version',
         'pythonpath',
     ]
@@ -80,6 +84,15 @@ except Exception:
     warnings.warn('Could not set temporary folder.')
     temp_folder = '.'
 
+# Cache of the functions decorated with @cached. Disabled by default.
+cache_enabled = False
+cache_folder = temp_folder + '/cache'
+cache_size = 1024 ** 3  # In bytes
+
+# True to share the arrays of TimeSeries.copy() until they are reassigned.
+# See TimeSeries.copy. Disabled by default.
+copy_on_write = False
+
 # Environment, including python path. If PYTHONPATH is defined in Spyder and
 # Spyder is opened as a standalone app, define PYTHONPATH as SPY_PYTHONPATH.
 env = os.environ.copy()
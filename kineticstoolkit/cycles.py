@@ -28,9 +28,10 @@ __license__ = "Apache 2.0"
 
 import numpy as np
 from kineticstoolkit.timeseries import TimeSeries, TimeSeriesEvent
-from kineticstoolkit.decorators import directory
+from kineticstoolkit.decorators import cached, directory
 import warnings
-from typing import List, Dict, Tuple, Sequence, Optional
+from copy import deepcopy
+from typing import List, Dict, Sequence, Optional
 
 
 def detect_cycles(ts: TimeSeries,
@@ -104,78 +105,99 @@ def detect_cycles(ts: TimeSeries,
     # Find the pushes
     time = ts.time
     data = ts.data[data_key]
+    n_samples = time.shape[0]
 
-    events = []
-
-    is_phase1 = True
-
-    for i in range(time.shape[0]):
-
-        if directions[0] == 'rising':
-            crossing1 = data[i] >= thresholds[0]
-            crossing2 = data[i] <= thresholds[1]
-        else:
-            crossing1 = data[i] <= thresholds[0]
-            crossing2 = data[i] >= thresholds[1]
-
-        if is_phase1 and crossing1:
-
-            is_phase1 = False
-            events.append(TimeSeriesEvent(time[i], event_names[0]))
-
-        elif (not is_phase1) and crossing2:
-
-            is_phase1 = True
-            events.append(TimeSeriesEvent(time[i], event_names[1]))
+    if directions[0] == 'rising':
+        crossing1 = data >= thresholds[0]
+        crossing2 = data <= thresholds[1]
+    else:
+        crossing1 = data <= thresholds[0]
+        crossing2 = data >= thresholds[1]
+
+    # Hysteresis: a sample that crosses only one threshold sets the phase,
+    # a sample that crosses both thresholds toggles the phase, and a sample
+    # that crosses none keeps the phase. The phase after each sample is thus
+    # the phase set by the last setting sample, toggled by every toggling
+    # sample since.
+    toggles = crossing1 & crossing2
+    sets = crossing1 ^ crossing2
+
+    index = np.arange(n_samples)
+    last_set = np.maximum.accumulate(np.where(sets, index, -1))
+    has_set = last_set >= 0
+    last_set[~has_set] = 0
+
+    n_toggles = np.cumsum(toggles)
+    n_toggles_since_set = n_toggles - np.where(
+        has_set, n_toggles[last_set], 0)
+
+    is_phase2 = np.where(has_set, crossing1[last_set], False)
+    is_phase2 ^= (n_toggles_since_set % 2).astype(bool)
+
+    # The events are the phase changes, starting in phase 1
+    event_indexes = np.nonzero(
+        np.diff(is_phase2.astype(int), prepend=0))[0]
+    event_is_phase2 = is_phase2[event_indexes]
 
     # Ensure that we start with event_name1 and that it's not on time0
-    while (events[0].name != event_names[0]) or (events[0].time == time[0]):
-        events = events[1:]
+    first_event = np.nonzero(
+        event_is_phase2 & (time[event_indexes] != time[0]))[0]
+    if first_event.size == 0:
+        return ts.copy()
+    event_indexes = event_indexes[first_event[0]:]
+
+    # Index ranges of the cycles. A cycle goes from index1 (start of phase 1)
+    # to index2 (start of phase 2) to index3 (start of the next cycle, or
+    # end of the TimeSeries for the last cycle).
+    index1 = event_indexes[0:-1:2]
+    index2 = event_indexes[1::2]
+    n_cycles = index2.shape[0]
+    index3 = np.append(event_indexes[2::2], n_samples - 1)[0:n_cycles]
+
+    time1 = time[index1]
+    time2 = time[index2]
+    time3 = np.append(time[event_indexes[2::2]], np.Inf)[0:n_cycles]
+
+    # Calculate the peaks of each cycle over inclusive index ranges, using
+    # one reduction on the ranges [index1, index2] and [index1, index3].
+    padded_data = np.append(data, np.nan)
+    if directions[0] == 'rising':
+        reduce1 = np.maximum.reduceat
+        reduce2 = np.minimum.reduceat
+    else:
+        reduce1 = np.minimum.reduceat
+        reduce2 = np.maximum.reduceat
+
+    the_peak1 = reduce1(
+        padded_data,
+        np.stack((index1, index2 + 1), axis=1).ravel())[0::2]
+    the_peak2 = reduce2(
+        padded_data,
+        np.stack((index1, index3 + 1), axis=1).ravel())[0::2]
 
     # Remove cycles where criteria are not reached.
-    valid_events = []
-
-    for i_event in range(0, len(events) - 1, 2):
-        time1 = events[i_event].time
-        time2 = events[i_event + 1].time
-        try:
-            time3 = events[i_event + 2].time
-        except IndexError:
-            time3 = np.Inf
-
-        sub_ts1 = ts.get_ts_between_times(time1, time2, inclusive=True)
-        sub_ts2 = ts.get_ts_between_times(time1, time3, inclusive=True)
-
-        if directions[0] == 'rising':
-            the_peak1 = np.max(sub_ts1.data[data_key])
-            the_peak2 = np.min(sub_ts2.data[data_key])
-        else:
-            the_peak1 = np.min(sub_ts1.data[data_key])
-            the_peak2 = np.max(sub_ts2.data[data_key])
-
-        if (time2 - time1 >= min_durations[0] and
-                time2 - time1 <= max_durations[0] and
-                time3 - time2 >= min_durations[1] and
-                time3 - time2 <= max_durations[1] and
-                the_peak1 >= min_peak_heights[0] and
-                the_peak1 <= max_peak_heights[0] and
-                the_peak2 >= min_peak_heights[1] and
-                the_peak2 <= max_peak_heights[1]):
-            # Save it.
-            valid_events.append(events[i_event])
-            valid_events.append(events[i_event + 1])
-            if not np.isinf(time3):
-                valid_events.append(TimeSeriesEvent(time3, '_'))
+    is_valid = ((time2 - time1 >= min_durations[0]) &
+                (time2 - time1 <= max_durations[0]) &
+                (time3 - time2 >= min_durations[1]) &
+                (time3 - time2 <= max_durations[1]) &
+                (the_peak1 >= min_peak_heights[0]) &
+                (the_peak1 <= max_peak_heights[0]) &
+                (the_peak2 >= min_peak_heights[1]) &
+                (the_peak2 <= max_peak_heights[1]))
 
     # Form the output timeseries
     tsout = ts.copy()
-    for event in valid_events:
-        tsout.add_event(event.time, event.name)
+    for i_cycle in np.nonzero(is_valid)[0]:
+        tsout.add_event(time1[i_cycle], event_names[0])
+        tsout.add_event(time2[i_cycle], event_names[1])
+        if not np.isinf(time3[i_cycle]):
+            tsout.add_event(time3[i_cycle], '_')
     tsout.sort_events()
 
     return tsout
 
 
+@cached
 def time_normalize(
         ts: TimeSeries, /,
         event_name1: str,
@@ -230,141 +252,177 @@ def time_normalize(
     # Optional span
     if span is None:
         span = [0, n_points]
+    n_span_points = span[1] - span[0]
 
     # Find the final number of cycles
     if len(ts.events) < 2:
         raise(ValueError('No cycle can be defined from these event names.'))
 
-    i_cycle = 0
+    # Find all cycle boundaries at once: each cycle begins at an event_name1
+    # and ends at the first following event_name2. We stop at the first
+    # event_name1 without a following event_name2.
+    begin_times = np.sort([event.time for event in ts.events
+                           if event.name == event_name1])
+    end_times = np.sort([event.time for event in ts.events
+                         if event.name == event_name2])
+    end_times = end_times[~np.isnan(end_times)]
+    i_end = np.searchsorted(end_times, begin_times, side='right')
+    n_cycles = int(np.argmin(np.append(i_end < end_times.shape[0], False)))
+
+    if n_cycles == 0:
+        raise(ValueError('No cycle can be defined from these event names.'))
+
+    begin_times = begin_times[0:n_cycles]
+    end_times = end_times[i_end[0:n_cycles]]
+
+    # Get the extended begin and end times considering relative_span
+    extended_begin_times = (begin_times +
+                            span[0] / n_points * (end_times - begin_times))
+    extended_end_times = (begin_times +
+                          span[1] / n_points * (end_times - begin_times))
+
+    # Build the sampling grid of shape (n_cycles, n_span_points), keeping
+    # only the first points of each cycle (the last one belongs to the next
+    # cycle). This is the same arithmetic as np.linspace.
+    step = (extended_end_times - extended_begin_times) / n_span_points
+    new_times = (np.arange(n_span_points)[np.newaxis] * step[:, np.newaxis] +
+                 extended_begin_times[:, np.newaxis]).ravel()
+
+    outside_cycles = np.nonzero(
+        (extended_begin_times > ts.time[-1]) |
+        (extended_end_times < ts.time[0]))[0]
+    if outside_cycles.shape[0] > 0:
+        raise ValueError(f"Cycle {outside_cycles[0]} is outside the "
+                         "TimeSeries' time range.")
+
+    for i_cycle in np.nonzero(
+            (extended_begin_times < ts.time[0]) |
+            (extended_end_times > ts.time[-1]))[0]:
+        warnings.warn(f"Cycle {i_cycle} has been extrapolated.")
+
+    # Express the grid as indexes in the original time vector
+    n_samples = ts.time.shape[0]
+    grid_index = np.searchsorted(ts.time, new_times, side='right') - 1
+    is_on_sample = ts.time[np.maximum(grid_index, 0)] == new_times
+
+    # Samples of the original TimeSeries that are spanned by each cycle
+    first_index = np.clip(
+        np.searchsorted(ts.time, extended_begin_times, side='right') - 1,
+        0, n_samples - 1)
+    last_index = np.clip(
+        np.searchsorted(ts.time, extended_end_times, side='left'),
+        0, n_samples - 1)
 
     # Initialize the destination TimeSeries
-    dest_ts = ts.copy()
-    dest_ts.events = []
+    dest_ts = TimeSeries(time=1.0 * np.arange(n_cycles * n_span_points),
+                         time_info=deepcopy(ts.time_info),
+                         data_info=deepcopy(ts.data_info))
     if n_points == 100:
         dest_ts.time_info['Unit'] = '%'
     else:
         dest_ts.time_info['Unit'] = f"1/{n_points}"
 
-    dest_data = {}  # type: Dict[str, List[np.ndarray]]
-    dest_data_shape = {}  # type: Dict[str, Tuple[int, ...]]
-
-    # Go through all cycles
-    while True:
-
-        # Get the begin time for this cycle
-        begin_time = ts.get_event_time(event_name1, i_cycle)
-
-        # Get the end time for this cycle
-        end_cycle = 0
-        end_time = ts.get_event_time(event_name2, end_cycle)
-        while end_time <= begin_time:
-            end_cycle += 1
-            end_time = ts.get_event_time(event_name2, end_cycle)
-
-        # We are done. Quit the loop.
-        if np.isnan(begin_time) or np.isnan(end_time):
-            break
-
-        # Get the extended begin and end times considering relative_span
-        extended_begin_time = (begin_time +
-                               span[0] / n_points *
-                               (end_time - begin_time))
-        extended_end_time = (begin_time +
-                             span[1] / n_points *
-                             (end_time - begin_time))
-
-        # Extract this cycle
-        subts = ts.get_ts_between_times(
-            extended_begin_time, extended_end_time, inclusive=True)
-        subts_backup = subts.copy()
-
-        if subts.time.shape[0] == 0:
-            raise ValueError("")
-
-        # Resample this cycle on span + 1
-        # (and get the first points after)
-        try:
-            subts.resample(
-                np.linspace(extended_begin_time,
-                            extended_end_time,
-                            span[1] - span[0] + 1))
-        except ValueError:
-            subts = subts_backup  # In case the try messed with subts
-            subts.resample(
-                np.linspace(extended_begin_time,
-                            extended_end_time,
-                            span[1] - span[0] + 1),
-                fill_value='extrapolate')
-            warnings.warn(f"Cycle {i_cycle} has been extrapolated.")
-
-        # Keep only the first points (the last one belongs to the next cycle)
-        subts = subts.get_ts_between_indexes(
-            0, span[1] - span[0] - 1, inclusive=True)
-
-        # Keep only the events in the unextended span
-        events = []
-        for event in subts.events:
-            if event.time >= begin_time and event.time < end_time:
-                events.append(event)
-        subts.events = events
-        subts.sort_events()
-
-        # Separate start/end events from the other
-        start_end_events = []
-        other_events = []
-        for event in subts.events:
-            if event.name == event_name1 or event.name == event_name2:
-                start_end_events.append(event)
-            else:
-                other_events.append(event)
-
-        # Add event_name1 at the beginning and end (duplicates will be
-        # cancelled at the end)
-        dest_ts.add_event(-span[0] +
-                          i_cycle * (span[1] - span[0]),
-                          event_name1)
-        dest_ts.add_event(-span[0] + n_points +
-                          i_cycle * (span[1] - span[0]),
-                          '_')
-
-        # Add the other events
-        def time_to_normalized_time(time):
-            """Resample the events times."""
-            return ((time - extended_begin_time) /
-                    (extended_end_time - extended_begin_time) *
-                    (span[1] - span[0]) + i_cycle * (span[1] - span[0]))
-
-        for i_event, event in enumerate(other_events):
-
-            # Resample
-            new_time = time_to_normalized_time(event.time)
-            dest_ts.add_event(new_time, event.name)
-
-        # Add this cycle to dest_time and dest_data
-        for key in subts.data:
-            if key not in dest_data:
-                dest_data[key] = []
-                dest_data_shape[key] = ts.data[key].shape
-            dest_data[key].append(subts.data[key])
-
-        i_cycle += 1
-
-    n_cycles = i_cycle
-
-    # Put back dest_time and dest_data in dest_ts
-    dest_ts.time = 1.0 * np.arange(n_cycles * (span[1] - span[0]))
+    # Interpolate every data key on the whole grid at once
     for key in ts.data:
-        # Stack the data into a [cycle, percent, values] shape
-        temp = np.array(dest_data[key])
-        # Reshape to put all cycles end to end
-        new_shape = list(dest_data_shape[key])
-        new_shape[0] = n_cycles * (span[1] - span[0])
-        dest_ts.data[key] = np.reshape(temp, new_shape)
 
+        # A sample with a nan in any of its values is missing
+        is_missing = ts.isnan(key)
+        n_valid = np.cumsum(np.append(0, ~is_missing))
+
+        if n_valid[-1] < 3:
+            new_shape = list(ts.data[key].shape)
+            new_shape[0] = new_times.shape[0]
+            dest_ts.data[key] = np.empty(new_shape)
+            dest_ts.data[key][:] = np.nan
+        else:
+            dest_ts.data[key] = _interpolate(
+                ts.time[~is_missing], ts.data[key][~is_missing], new_times)
+
+        # Put back nans around the missing samples
+        if np.any(is_missing):
+            padded_is_missing = np.concatenate(
+                ([is_missing[0]], is_missing, [is_missing[-1]]))
+            dest_ts.data[key][
+                padded_is_missing[grid_index + 1] |
+                (padded_is_missing[grid_index + 2] & ~is_on_sample)] = np.nan
+
+        # Cycles with almost only nans cannot be interpolated
+        n_valid = n_valid[last_index + 1] - n_valid[first_index]
+        for i_cycle in np.nonzero(n_valid < 3)[0]:
+            warnings.warn(
+                f'Warning: Almost only NaNs found in signal "{key}.')
+            dest_ts.data[key][
+                i_cycle * n_span_points:(i_cycle + 1) * n_span_points] = np.nan
+
+    # Sorted events, with duplicates removed
+    sorted_ts = TimeSeries(events=ts.events)
+    sorted_ts.sort_events()
+    event_times = np.array([event.time for event in sorted_ts.events])
+    event_names = np.array([event.name for event in sorted_ts.events])
+
+    # Remap the events of every cycle. Each cycle gets an event_name1 at its
+    # beginning and a '_' at its end (duplicates are cancelled at the end),
+    # followed by its other events.
+    cycle_offsets = np.arange(n_cycles) * n_span_points
+    i_first_event = np.searchsorted(event_times, begin_times, side='left')
+    i_last_event = np.searchsorted(event_times, end_times, side='left')
+    n_events = i_last_event - i_first_event
+
+    event_cycles = np.repeat(np.arange(n_cycles), n_events)
+    i_events = (np.arange(np.sum(n_events)) -
+                np.repeat(np.cumsum(n_events) - n_events, n_events) +
+                np.repeat(i_first_event, n_events))
+    is_other = ((event_names[i_events] != event_name1) &
+                (event_names[i_events] != event_name2))
+    event_cycles = event_cycles[is_other]
+    i_events = i_events[is_other]
+
+    other_times = ((event_times[i_events] -
+                    extended_begin_times[event_cycles]) /
+                   (extended_end_times[event_cycles] -
+                    extended_begin_times[event_cycles]) *
+                   n_span_points + cycle_offsets[event_cycles])
+
+    new_event_times = np.concatenate((
+        -span[0] + cycle_offsets,
+        -span[0] + n_points + cycle_offsets,
+        other_times))
+    new_event_names = np.concatenate((
+        np.repeat(event_name1, n_cycles),
+        np.repeat('_', n_cycles),
+        event_names[i_events])).astype(object)
+    order = np.lexsort((
+        np.concatenate((np.zeros(n_cycles), np.ones(n_cycles),
+                        2 + np.arange(i_events.shape[0]))),
+        np.concatenate((np.arange(n_cycles), np.arange(n_cycles),
+                        event_cycles))))
+
+    dest_ts.events = [
+        TimeSeriesEvent(new_event_times[i], new_event_names[i])
+        for i in order]
     dest_ts.sort_events()
     return dest_ts
 
 
+def _interpolate(time: np.ndarray, data: np.ndarray,
+                 new_time: np.ndarray) -> np.ndarray:
+    """
+    Linearly interpolate or extrapolate data on a new time vector.
+
+    This is a vectorized gather-and-lerp: the indexes of the samples that
+    surround every new time are gathered at once, then the data is linearly
+    interpolated between these samples.
+    """
+    index_lo = np.clip(np.searchsorted(time, new_time, side='right') - 1,
+                       0, time.shape[0] - 2)
+    index_hi = index_lo + 1
+    time_lo = time[index_lo]
+    fraction = (new_time - time_lo) / (time[index_hi] - time_lo)
+    fraction = fraction.reshape([-1] + [1] * (len(data.shape) - 1))
+    data_lo = data[index_lo]
+    return data_lo + fraction * (data[index_hi] - data_lo)
+
+
 def stack(ts: TimeSeries, /, n_points: int = 100) -> Dict[str, np.ndarray]:
     """
     Stack time-normalized TimeSeries' data into a dict of arrays.
@@ -554,42 +612,39 @@ def most_repeatable_cycles(data: np.ndarray, /) -> List[int]:
     [1, 3, 0, 2]
 
     """
-    data = data.copy()
     n_cycles = data.shape[0]
+    data = np.reshape(data, (n_cycles, int(np.prod(data.shape[1:]))))
     out_cycles = []  # type: List[int]
-    done_cycles = []  # type: List[int]  # Like out_cycles but includes NaNs
 
-    # Exclude cycles with nans: put nans for all data of this cycle
-    for i_cycle in range(n_cycles-1, -1, -1):
-        if np.isnan(np.sum(data[i_cycle])):
-            data[i_cycle] = np.nan
-            done_cycles.append(i_cycle)
+    # Exclude cycles with nans
+    is_remaining = ~np.isnan(np.sum(data, axis=1))
+
+    # Keep a running sum and count of the remaining cycles, so that their
+    # mean can be updated when a cycle is removed instead of recalculated.
+    running_sum = np.sum(data[is_remaining], axis=0)
+    n_remaining = np.count_nonzero(is_remaining)
 
     # Iteratively remove the cycle that is the most different from the
     # mean of the remaining cycles.
-    while len(done_cycles) < n_cycles - 2:
-
-        current_mean_cycle = np.nanmean(data, axis=0)
+    while n_remaining > 2:
 
-        rms = np.zeros(n_cycles)
+        current_mean_cycle = running_sum / n_remaining
 
-        for i_curve in range(n_cycles-1, -1, -1):
-            rms[i_curve] = np.sqrt(np.mean(np.sum(
-                (data[i_curve] - current_mean_cycle) ** 2)))
+        rms = np.sqrt(np.sum((data - current_mean_cycle) ** 2, axis=1))
+        rms[~is_remaining] = -np.inf
 
-        i_cycle = np.nanargmax(rms)
+        i_cycle = int(np.argmax(rms))
         out_cycles.append(i_cycle)
-        done_cycles.append(i_cycle)
-        data[i_cycle] = np.nan
+        is_remaining[i_cycle] = False
+        running_sum -= data[i_cycle]
+        n_remaining -= 1
 
     # Find the two remaining cycles
-    set_all = set(range(n_cycles))
-    set_done = set(done_cycles)
-    remain = sorted(list(set_all - set_done))
+    remain = np.nonzero(is_remaining)[0]
     if len(remain) > 1:
-        out_cycles.append(remain[1])
+        out_cycles.append(int(remain[1]))
     if len(remain) > 0:
-        out_cycles.append(remain[0])
+        out_cycles.append(int(remain[0]))
 
     return out_cycles[-1::-1]
 
@@ -29,6 +29,10 @@ The following decorator can be used on each Kinetics Toolkit's's function:
     - @dead:
         Undocumented, deprecated function in the development version.
 
+    - @cached:
+        Results stored on disk and reused for identical inputs, if
+        kineticstoolkit.config.cache_enabled is True.
+
     Each of these decorators add the _include_in_dir property to the decorated
     function. The provided function ``directory`` looks at these properties
     to return a custom __dir__ to Kinematics Toolkit's classes. See such class
@@ -46,9 +50,21 @@ from functools import wraps
 import warnings
 import textwrap
 import kineticstoolkit.config
+import numpy as np
+import os
+import pickle
+import hashlib
+import inspect
+import tempfile
+import threading
+import time
 from typing import Dict, List, Any
 
 
+# Set in the __flags__ of the classes defined in Python rather than in C
+_Py_TPFLAGS_HEAPTYPE = 1 << 9
+
+
 def _inject_in_docstring(docstring: str, text: str) -> str:
     """Inject a string into the top of a docstring, after line 1."""
     if docstring == '' or docstring is None:
@@ -163,6 +179,240 @@ def dead(since: str, until: str, details=''):
     return real_decorator
 
 
+def _keeps_state_in_dict(value: Any) -> bool:
+    """Tell if an object is an instance of pure Python classes sans slots."""
+    if not hasattr(value, '__dict__'):
+        return False
+    for cls in type(value).__mro__:
+        if cls is object:
+            continue
+        if (not cls.__flags__ & _Py_TPFLAGS_HEAPTYPE  # Defined in C
+                or '__slots__' in vars(cls)):
+            return False
+    return True
+
+
+def _fingerprint(value: Any, hasher) -> None:
+    """
+    Feed a value into a hash object.
+
+    Arrays are hashed by dtype, shape and contents. Containers are hashed
+    recursively, module-level functions and classes by name, and instances
+    of Python classes that keep their whole state in __dict__ (e.g.,
+    TimeSeries) by type and attributes. Raises TypeError for any other value
+    (closures, local functions, objects with __slots__ or defined in C),
+    since its name or __dict__ would not identify it.
+    """
+    if value is None or isinstance(value, (bool, int, float, complex, str)):
+        hasher.update(repr((type(value).__name__, value)).encode())
+    elif isinstance(value, np.ndarray):
+        hasher.update(f'ndarray{value.dtype.str}{value.shape}'.encode())
+        if value.dtype.hasobject:
+            _fingerprint(value.tolist(), hasher)
+        else:
+            hasher.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, np.generic):
+        hasher.update(f'{value.dtype.str}'.encode() + value.tobytes())
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _fingerprint(item, hasher)
+    elif isinstance(value, dict):
+        hasher.update(f'dict{len(value)}'.encode())
+        for key in value:
+            _fingerprint(key, hasher)
+            _fingerprint(value[key], hasher)
+    elif ((inspect.isfunction(value) and value.__closure__ is None
+           or inspect.isclass(value))
+          and '<locals>' not in value.__qualname__):
+        # Module-level functions and classes are identified by their name
+        hasher.update(f'{value.__module__}.{value.__qualname__}'.encode())
+    elif _keeps_state_in_dict(value):
+        hasher.update(f'{type(value).__module__}.'
+                      f'{type(value).__qualname__}'.encode())
+        _fingerprint(vars(value), hasher)
+    else:
+        raise TypeError(f'Cannot fingerprint a {type(value).__name__}.')
+
+
+def _fingerprint_code(code, hasher) -> None:
+    """Feed a code object and the code objects it defines into a hash."""
+    hasher.update(code.co_code)
+    hasher.update(repr((code.co_names, code.co_varnames)).encode())
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            _fingerprint_code(const, hasher)
+        elif isinstance(const, frozenset):  # Order changes between sessions
+            hasher.update(repr(sorted(repr(item) for item in const)).encode())
+        else:
+            hasher.update(repr(const).encode())
+
+
+def _cache_entries(prefix: str = '') -> List[os.DirEntry]:
+    """List the cache files whose name starts with prefix."""
+    try:
+        with os.scandir(kineticstoolkit.config.cache_folder) as entries:
+            return [entry for entry in entries
+                    if entry.name.startswith(prefix)
+                    and entry.name.endswith('.pkl')]
+    except FileNotFoundError:
+        return []
+
+
+def _touch(filename: str) -> None:
+    """Mark a cache file as recently used."""
+    # File systems may set timestamps at a coarse resolution, which would
+    # make recent files undistinguishable. Set them precisely.
+    now = time.time_ns()
+    os.utime(filename, ns=(now, now))
+
+
+def _evict_cache() -> None:
+    """Remove the least recently used cache files that exceed cache_size."""
+    entries = []
+    for entry in _cache_entries():
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:  # Removed concurrently
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    entries.sort()
+
+    total_size = sum(entry[1] for entry in entries)
+    for (_, size, path) in entries:
+        if total_size <= kineticstoolkit.config.cache_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def clear_cache() -> None:
+    """Remove every result stored by the functions decorated with @cached."""
+    for entry in _cache_entries():
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def cached(func):
+    """
+    Decorate Kinetics Toolkit's functions whose results can be cached.
+
+    If kineticstoolkit.config.cache_enabled is True, the result of each call
+    is stored in kineticstoolkit.config.cache_folder, indexed by a
+    fingerprint of the function's name and code, the Kinetics Toolkit
+    version and every argument (including the time, data, events and info
+    of TimeSeries). Calling the function again with identical arguments
+    returns a copy of the stored result instead of computing it again. When
+    the cache exceeds kineticstoolkit.config.cache_size bytes, the least
+    recently used results are removed. Calls with arguments that cannot be
+    fingerprinted are not cached.
+
+    Since the function is not called when its result is found in the cache,
+    its side effects are not repeated: nothing is printed, and no warning
+    is issued. Changes to the code of the functions that it calls do not
+    invalidate the stored results; use clear_cache() after such changes.
+
+    The decorated function gets these additional functions:
+
+    - cache_info(): returns a dict with the number of hits and misses since
+      the start of the session, and the number and size in bytes of the
+      stored results of this function.
+    - cache_clear(): removes the stored results of this function.
+
+    Use kineticstoolkit.decorators.clear_cache() to remove every stored
+    result.
+
+    """
+    signature = inspect.signature(func)
+    prefix = f'{func.__module__}.{func.__qualname__}.'
+    code_hasher = hashlib.blake2b(digest_size=20)
+    _fingerprint_code(func.__code__, code_hasher)
+    code_digest = code_hasher.hexdigest()
+    stats = {'hits': 0, 'misses': 0}
+    lock = threading.Lock()
+
+    def count(stat: str) -> None:
+        with lock:
+            stats[stat] += 1
+
+    # Ensure the decorated function keeps its metadata
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not kineticstoolkit.config.cache_enabled:
+            return func(*args, **kwargs)
+
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        hasher = hashlib.blake2b(digest_size=20)
+        try:
+            _fingerprint([prefix, kineticstoolkit.config.version,
+                          code_digest, dict(arguments.arguments)], hasher)
+        except TypeError:
+            return func(*args, **kwargs)
+        filename = (kineticstoolkit.config.cache_folder + '/' +
+                    prefix + hasher.hexdigest() + '.pkl')
+
+        # Hit
+        try:
+            with open(filename, 'rb') as fid:
+                result = pickle.load(fid)
+            _touch(filename)
+            count('hits')
+            return result
+        except Exception:  # Not in cache, or removed or corrupted.
+            pass
+
+        # Miss
+        count('misses')
+        result = func(*args, **kwargs)
+        try:
+            os.makedirs(kineticstoolkit.config.cache_folder, exist_ok=True)
+            fid, temp_filename = tempfile.mkstemp(
+                suffix='.tmp', dir=kineticstoolkit.config.cache_folder)
+            try:
+                with os.fdopen(fid, 'wb') as file:
+                    pickle.dump(result, file,
+                                protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_filename, filename)
+                _touch(filename)
+            except BaseException:
+                os.remove(temp_filename)
+                raise
+            _evict_cache()
+        except Exception as error:
+            warnings.warn(f'Could not cache the result of {func.__name__}: '
+                          f'{error}')
+        return result
+
+    def cache_info() -> Dict[str, int]:
+        entries = _cache_entries(prefix)
+        sizes = []
+        for entry in entries:
+            try:
+                sizes.append(entry.stat().st_size)
+            except FileNotFoundError:  # Removed concurrently
+                pass
+        with lock:
+            return {'hits': stats['hits'], 'misses': stats['misses'],
+                    'entries': len(sizes), 'size': sum(sizes)}
+
+    def cache_clear() -> None:
+        for entry in _cache_entries(prefix):
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+
 def directory(module_locals: Dict[str, Any]) -> List[str]:
     """
     Return the module's public directory for dir function.
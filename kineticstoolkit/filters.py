@@ -30,7 +30,7 @@ import scipy.signal as sgl
 import scipy.ndimage as ndi
 import warnings
 from kineticstoolkit import TimeSeries
-from kineticstoolkit.decorators import directory
+from kineticstoolkit.decorators import cached, directory
 from typing import Tuple, Union, Sequence, List
 
 import kineticstoolkit as ktk  # for doctests
@@ -50,6 +50,18 @@ def _interpolate(ts: TimeSeries, key: str) -> Tuple[TimeSeries, np.ndarray]:
     return (ts, nan_index)
 
 
+def _get_sampling_period(ts: TimeSeries) -> float:
+    """Get the sampling period of a TimeSeries, warn if it is not constant."""
+    if ts.is_uniform:
+        return 1 / ts.sampling_rate
+
+    delta = ts.time[1] - ts.time[0]
+    if not np.isnan(delta):
+        warnings.warn('The sampling rate is not constant. The first '
+                      'sampling interval has been used.')
+    return delta
+
+
 def savgol(ts: TimeSeries, /, *, window_length: int, poly_order: int,
            deriv: int = 0) -> TimeSeries:
     """
@@ -81,7 +93,7 @@ def savgol(ts: TimeSeries, /, *, window_length: int, poly_order: int,
     """
     tsout = ts.copy()
 
-    delta = ts.time[1] - ts.time[0]
+    delta = _get_sampling_period(ts)
 
     for key in tsout.data.keys():
 
@@ -135,6 +147,7 @@ def smooth(ts: TimeSeries, /, window_length: int) -> TimeSeries:
     return tsout
 
 
+@cached
 def butter(ts: TimeSeries, /, fc: Union[float, Sequence], *, order: int = 2,
            btype: str = 'lowpass', filtfilt: bool = True) -> TimeSeries:
     """
@@ -170,7 +183,7 @@ def butter(ts: TimeSeries, /, fc: Union[float, Sequence], *, order: int = 2,
     ts = ts.copy()
 
     # Create the filter
-    fs = (1 / (ts.time[1] - ts.time[0]))
+    fs = 1 / _get_sampling_period(ts)
     if np.isnan(fs):
         raise ValueError("The TimeSeries' time vector must not contain NaNs.")
 
@@ -251,13 +264,14 @@ def deriv(ts: TimeSeries, /, n: int = 1) -> TimeSeries:
 
     """
     out_ts = ts.copy()
+    delta = _get_sampling_period(ts)
 
     for i in range(n):
         out_ts.time = (out_ts.time[1:] + out_ts.time[0:-1]) / 2
 
     for key in ts.data:
         out_ts.data[key] = np.diff(
-            ts.data[key], n=n, axis=0) / (ts.time[1] - ts.time[0]) ** n
+            ts.data[key], n=n, axis=0) / delta ** n
 
     return out_ts
 
@@ -33,12 +33,12 @@ __license__ = "Apache 2.0"
 
 import numpy as np
 import scipy.spatial.transform as transform
-import kineticstoolkit.external.icp as icp
 from kineticstoolkit.decorators import unstable, directory
 from typing import Optional, Tuple
 
 
-def matmul(op1: np.ndarray, op2: np.ndarray) -> np.ndarray:
+def matmul(op1: np.ndarray, op2: np.ndarray, *,
+           out: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Matrix multiplication between series of matrices.
 
@@ -47,7 +47,8 @@ def matmul(op1: np.ndarray, op2: np.ndarray) -> np.ndarray:
     dimension always corresponds to time.
 
     It aligns and create additionnal dimensions if needed to avoid dimension
-    mismatch errors.
+    mismatch errors. The multiplication is performed on the whole series at
+    once, without looping over samples.
 
     Parameters
     ----------
@@ -55,6 +56,9 @@ def matmul(op1: np.ndarray, op2: np.ndarray) -> np.ndarray:
         Series of floats, vectors or matrices.
     op2
         Series of floats, vectors or matrices.
+    out
+        Optional. Array where the result is stored. It must have the shape of
+        the expected result.
 
     Returns
     -------
@@ -62,24 +66,52 @@ def matmul(op1: np.ndarray, op2: np.ndarray) -> np.ndarray:
         The product, as a series of Nx4 or Nx4xM matrices.
 
     """
-    def perform_mul(op1, op2):
-        if isinstance(op1, np.ndarray) and isinstance(op2, np.ndarray):
-            return op1 @ op2
-        else:
-            return op1 * op2  # In the case where we have a series of floats.
-
+    op1 = np.asarray(op1)
+    op2 = np.asarray(op2)
     (op1, op2) = _match_size(op1, op2)
 
-    n_samples = op1.shape[0]
-
-    # Get the expected shape by performing the first multiplication
-    temp = perform_mul(op1[0], op2[0])
-    result = np.empty((n_samples, *temp.shape))
-
-    # Perform the multiplication
-    for i_sample in range(n_samples):
-        result[i_sample] = perform_mul(op1[i_sample], op2[i_sample])
+    dtype = float if out is None else None
 
+    # Series of floats: element-wise multiplication, broadcasted on the
+    # remaining dimensions of the other operand.
+    if op1.ndim == 1 or op2.ndim == 1:
+        if op1.ndim == 1:
+            op1 = op1.reshape([-1] + [1] * (op2.ndim - 1))
+        else:
+            op2 = op2.reshape([-1] + [1] * (op1.ndim - 1))
+        return np.multiply(op1, op2, out=out, dtype=dtype)
+
+    # Series of vectors: add a dimension so that numpy's matmul treats them
+    # as row (op1) or column (op2) vectors, then remove this dimension in the
+    # result. When out is given, the same dimension is added to a view of out.
+    vector1 = (op1.ndim == 2)
+    vector2 = (op2.ndim == 2)
+    if vector1:
+        op1 = op1[:, np.newaxis, :]
+    if vector2:
+        op2 = op2[:, :, np.newaxis]
+
+    # Align the time dimension when the operands have a different number of
+    # dimensions.
+    while op1.ndim < op2.ndim:
+        op1 = op1[:, np.newaxis]
+    while op2.ndim < op1.ndim:
+        op2 = op2[:, np.newaxis]
+
+    if out is not None:
+        out_view = out
+        if vector2:
+            out_view = out_view[..., np.newaxis]
+        if vector1:
+            out_view = out_view[..., np.newaxis, :]
+        np.matmul(op1, op2, out=out_view)
+        return out
+
+    result = np.matmul(op1, op2, dtype=dtype)
+    if vector1:
+        result = result[..., 0, :]
+    if vector2:
+        result = result[..., 0]
     return result
 
 
@@ -456,7 +488,6 @@ def get_local_coordinates(global_coordinates: np.ndarray,
     inv_ref_rot = np.transpose(ref_rot, (0, 2, 1))
 
     # Inverse translation : we inverse-rotate the translation.
-    inv_ref_t = np.zeros(ref_t.shape)
     inv_ref_t = matmul(inv_ref_rot, -ref_t)
 
     inv_ref_T = np.zeros((n_samples, 4, 4))  # init
@@ -464,7 +495,6 @@ def get_local_coordinates(global_coordinates: np.ndarray,
     inv_ref_T[:, 0:3, 3] = inv_ref_t
     inv_ref_T[:, 3, 3] = np.ones(n_samples)
 
-    local_coordinates = np.zeros(global_coordinates.shape)  # init
     local_coordinates = matmul(inv_ref_T, global_coordinates)
 
     # Put back the NaNs
@@ -499,9 +529,7 @@ def get_global_coordinates(local_coordinates: np.ndarray,
         `local_coordinates`.
 
     """
-    global_coordinates = np.zeros(local_coordinates.shape)
-    global_coordinates = matmul(reference_frames, local_coordinates)
-    return global_coordinates
+    return matmul(reference_frames, local_coordinates)
 
 
 @unstable
@@ -535,19 +563,20 @@ def _match_size(op1: np.ndarray, op2: np.ndarray
     Broadcasts the first dimension of op1 or op2, if required, so that both
     inputs have the same size in first dimension. If no modification is
     required on an input, then the output is a reference to the same input.
-    Otherwise, the output is a new variable.
+    Otherwise, the output is a read-only broadcasted view of the input, so
+    that no data is copied.
 
     Returns
     -------
     2x np.ndarray
-        References or copies of op1 and op2 now matched in size.
+        References or views of op1 and op2 now matched in size.
 
     """
     if op1.shape[0] == 1:
-        op1 = np.repeat(op1, op2.shape[0], axis=0)
+        op1 = np.broadcast_to(op1, (op2.shape[0], *op1.shape[1:]))
 
     if op2.shape[0] == 1:
-        op2 = np.repeat(op2, op1.shape[0], axis=0)
+        op2 = np.broadcast_to(op2, (op1.shape[0], *op2.shape[1:]))
 
     if op1.shape[0] != op2.shape[0]:
         raise ValueError(
@@ -583,33 +612,59 @@ def register_points(global_points: np.ndarray,
     """
     n_samples = global_points.shape[0]
 
+    # Identify which points are visible in both global and local points, for
+    # every sample at once.
+    visible = ~(np.isnan(global_points).any(axis=1) |
+                np.isnan(local_points).any(axis=1))  # Nxm
+    n_visible = np.sum(visible, axis=1)
+
+    # If at least 3 common points are visible between local and global
+    # points, then we can regress the transformation.
+    valid = n_visible >= 3
+
     # Prealloc the transformation matrix
-    T = np.zeros((n_samples, 4, 4))
-    T[:, 3, 3] = np.ones(n_samples)
-
-    for i_sample in range(n_samples):
-
-        # Identify which global points are visible
-        sample_global_points = global_points[i_sample]
-        sample_global_points_missing = np.isnan(
-            np.sum(sample_global_points, axis=0))
-
-        # Identify which local points are visible
-        sample_local_points = local_points[i_sample]
-        sample_local_points_missing = np.isnan(
-            np.sum(sample_local_points, axis=0))
-
-        sample_points_missing = np.logical_or(
-            sample_global_points_missing, sample_local_points_missing)
-
-        # If at least 3 common points are visible between local and global
-        # points, then we can regress the transformation.
-        if sum(~sample_points_missing) >= 3:
-            T[i_sample] = icp.best_fit_transform(
-                sample_local_points[0:3, ~sample_points_missing].T,
-                sample_global_points[0:3, ~sample_points_missing].T)[0]
-        else:
-            T[i_sample] = np.nan
+    T = np.empty((n_samples, 4, 4))
+    T[~valid] = np.nan
+
+    if not np.any(valid):
+        return T
+
+    # Work only on the valid samples. Invisible points are zeroed and excluded
+    # from the centroids and cross-covariance matrices using the visibility
+    # mask as weights, which gives the same result as selecting only the
+    # visible points of each sample.
+    weights = visible[valid].astype(float)[:, np.newaxis, :]  # Nx1xM
+    A = np.where(weights > 0, local_points[valid, 0:3], 0.0)  # Nx3xM
+    B = np.where(weights > 0, global_points[valid, 0:3], 0.0)  # Nx3xM
+    n = n_visible[valid][:, np.newaxis, np.newaxis]
+
+    # Translate points to their centroids
+    centroid_A = np.sum(A, axis=2, keepdims=True) / n  # Nx3x1
+    centroid_B = np.sum(B, axis=2, keepdims=True) / n  # Nx3x1
+    AA = (A - centroid_A) * weights
+    BB = (B - centroid_B) * weights
+
+    # Rotation matrices, using one stacked SVD for all samples
+    H = AA @ np.transpose(BB, (0, 2, 1))  # Nx3x3
+    U, _, Vt = np.linalg.svd(H)
+    R = np.transpose(Vt, (0, 2, 1)) @ np.transpose(U, (0, 2, 1))
+
+    # Special reflection case
+    reflected = np.linalg.det(R) < 0
+    if np.any(reflected):
+        Vt[reflected, 2, :] *= -1
+        R[reflected] = (np.transpose(Vt[reflected], (0, 2, 1)) @
+                        np.transpose(U[reflected], (0, 2, 1)))
+
+    # Translations
+    t = centroid_B - R @ centroid_A  # Nx3x1
+
+    # Homogeneous transformations
+    T_valid = np.zeros((R.shape[0], 4, 4))
+    T_valid[:, 0:3, 0:3] = R
+    T_valid[:, 0:3, 3] = t[:, :, 0]
+    T_valid[:, 3, 3] = 1
+    T[valid] = T_valid
 
     return T
 
@@ -27,12 +27,14 @@ __license__ = "Apache 2.0"
 
 import kineticstoolkit.geometry as geometry
 from kineticstoolkit import TimeSeries
-from kineticstoolkit.decorators import unstable, directory
-from typing import Sequence, Dict, Any
+from kineticstoolkit.decorators import unstable, cached, directory
+from typing import Sequence, Dict, Any, Tuple
 
 import numpy as np
 import warnings
 import struct  # To unpack data from N3D files
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
     import ezc3d
@@ -164,7 +166,9 @@ def write_c3d_file(filename: str, markers: TimeSeries) -> None:
     c3d.write(filename)
 
 
-def read_n3d_file(filename: str, labels: Sequence[str] = []):
+def read_n3d_file(filename: str, labels: Sequence[str] = [], *,
+                  data_keys: Sequence[str] = [],
+                  memory_map: bool = False):
     """
     Read markers from an NDI N3D file.
 
@@ -182,6 +186,13 @@ def read_n3d_file(filename: str, labels: Sequence[str] = []):
         Path of the N3D file.
     labels : list of str (optional)
         Marker names
+    data_keys : list of str (optional)
+        Marker names to read. Only these markers are converted and included
+        in the output TimeSeries. If left empty, every marker is read.
+    memory_map : bool (optional)
+        True to memory-map the file instead of reading it completely in
+        memory. Only the columns of the requested markers are then loaded.
+        This is useful for very large files. Default is False.
 
     Returns
     -------
@@ -206,18 +217,16 @@ def read_n3d_file(filename: str, labels: Sequence[str] = []):
         date_of_collection = struct.unpack('8s', fid.read(8))[0]
         extended_header = struct.unpack('73s', fid.read(73))[0]
 
-        # Read the rest and put it in an array
-        ndi_array = np.ones((n_frames, n_columns)) * np.NaN
-
-        for i_frame in range(n_frames):
-            for i_column in range(n_columns):
-                data = struct.unpack('f', fid.read(4))[0]
-                if (data < -1E25):  # technically, it is -3.697314e+28
-                    data = np.NaN
-                ndi_array[i_frame, i_column] = data
-
-        # Conversion from mm to meters
-        ndi_array /= 1000
+        # Read the rest as a single block of floats, one row per frame
+        header_size = fid.tell()
+        if memory_map or len(data_keys) > 0:
+            ndi_array = np.memmap(fid, dtype=np.float32, mode='r',
+                                  offset=header_size,
+                                  shape=(n_frames, n_columns))
+        else:
+            ndi_array = np.fromfile(fid, dtype=np.float32,
+                                    count=n_frames * n_columns)
+            ndi_array = ndi_array.reshape((n_frames, n_columns))
 
         # Transformation to a TimeSeries
         ts = TimeSeries(
@@ -230,9 +239,22 @@ def read_n3d_file(filename: str, labels: Sequence[str] = []):
             else:
                 label = f'Marker{i_marker}'
 
-            ts.data[label] = np.block([[
-                ndi_array[:, 3*i_marker:3*i_marker+3],
-                np.ones((n_frames, 1))]])
+            if len(data_keys) > 0 and label not in data_keys:
+                continue
+
+            marker = np.ones((n_frames, 4))
+            marker[:, 0:3] = ndi_array[
+                :, n_data_per_marker * i_marker:
+                n_data_per_marker * i_marker + 3]
+
+            # Missing values: technically, the value is -3.697314e+28
+            position = marker[:, 0:3]
+            position[position < -1E25] = np.nan
+
+            # Conversion from mm to meters
+            position /= 1000
+
+            ts.data[label] = marker
             ts.add_data_info(label, 'Unit', 'm')
 
     return ts
@@ -410,10 +432,12 @@ def create_rigid_body_config(
     }
 
 
+@cached
 def register_markers(
         markers: TimeSeries,
         rigid_body_configs: Dict[str, Dict[str, Any]],
-        verbose: bool = False
+        verbose: bool = False, *,
+        workers: int = 1
 ) -> TimeSeries:
     """
     Calculate the trajectory of rigid bodies.
@@ -435,7 +459,12 @@ def register_markers(
         each rigid body configuration is a dict with the following
         keys: 'MarkerNames' and 'LocalPoints'.
     verbose
-        Optional. Set to True to print the rigid body being computed.
+        Optional. Set to True to print the rigid body being computed and the
+        time spent on each rigid body.
+    workers
+        Optional. Number of rigid bodies to compute concurrently. The rigid
+        bodies are computed in a pool of threads that share the markers
+        arrays without copying them. Default is 1 (no concurrency).
 
     Returns
     -------
@@ -447,9 +476,9 @@ def register_markers(
                               time_info=markers.time_info,
                               events=markers.events)
 
-    for rigid_body_name in rigid_body_configs:
-        if verbose is True:
-            print(f'Computing trajectory of rigid body {rigid_body_name}...')
+    def register_one(rigid_body_name: str) -> Tuple[np.ndarray, float]:
+        """Compute the trajectory of one rigid body and its duration."""
+        start_time = time.perf_counter()
 
         # Set local and global points
         local_points = rigid_body_configs[rigid_body_name]['LocalPoints']
@@ -468,8 +497,43 @@ def register_markers(
             local_points, global_points)
 
         # Compute the rigid body trajectory
-        rigid_bodies.data[rigid_body_name] = geometry.register_points(
-            global_points, local_points)
+        trajectory = geometry.register_points(global_points, local_points)
+        return trajectory, time.perf_counter() - start_time
+
+    def report(rigid_body_name: str, duration: float) -> None:
+        if verbose is True:
+            print(f'Computed trajectory of rigid body {rigid_body_name} '
+                  f'in {duration:.3f} s.')
+
+    if workers > 1:
+        # numpy releases the GIL during the heavy array operations of
+        # register_points, so that threads run concurrently.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for rigid_body_name in rigid_body_configs:
+                if verbose is True:
+                    print('Computing trajectory of rigid body '
+                          f'{rigid_body_name}...')
+                futures[executor.submit(register_one, rigid_body_name)] = \
+                    rigid_body_name
+
+            results = {}
+            for future in as_completed(futures):
+                (results[futures[future]], duration) = future.result()
+                report(futures[future], duration)
+
+        # Add the rigid bodies in the same order as rigid_body_configs
+        for rigid_body_name in rigid_body_configs:
+            rigid_bodies.data[rigid_body_name] = results[rigid_body_name]
+
+    else:
+        for rigid_body_name in rigid_body_configs:
+            if verbose is True:
+                print('Computing trajectory of rigid body '
+                      f'{rigid_body_name}...')
+            (rigid_bodies.data[rigid_body_name], duration) = register_one(
+                rigid_body_name)
+            report(rigid_body_name, duration)
 
     return rigid_bodies
 
@@ -548,7 +612,8 @@ def write_trc_file(markers: TimeSeries, filename: str) -> None:
 
     n_markers = len(markers.data)
     n_frames = markers.time.shape[0]
-    data_rate = n_frames / (markers.time[1] - markers.time[0])
+    data_rate = (markers.sampling_rate if markers.is_uniform
+                 else 1 / (markers.time[1] - markers.time[0]))
     camera_rate = data_rate
     units = 'm'
 
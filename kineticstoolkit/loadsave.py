@@ -28,9 +28,9 @@ __copyright__ = "Copyright (C) 2020 Félix Chénier"
 __email__ = "chenier.felix@uqam.ca"
 __license__ = "Apache 2.0"
 
-from kineticstoolkit.timeseries import TimeSeries
+from kineticstoolkit.timeseries import TimeSeries, TimeSeriesEvent
 from kineticstoolkit.timeseries import dataframe_to_dict_of_arrays
-from kineticstoolkit.decorators import directory
+from kineticstoolkit.decorators import unstable, directory
 import kineticstoolkit.config
 
 import scipy.io as spio
@@ -40,24 +40,49 @@ import pandas as pd
 from ast import literal_eval
 import csv
 import warnings
-import shutil
 import json
 from datetime import datetime
 import time
 import getpass
 import zipfile
-
-from typing import Any, List
-
-
-def save(filename: str, variable: Any) -> None:
+import struct
+import tempfile
+import stat
+import io
+import threading
+from concurrent.futures import (
+    Executor, ThreadPoolExecutor, ProcessPoolExecutor, as_completed)
+from dataclasses import dataclass
+from copy import deepcopy
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping, MutableSequence
+
+from typing import (
+    Any, List, Dict, Callable, Optional, Sequence, Iterator)
+
+
+_ALIGNMENT = 64  # Alignment of uncompressed arrays in ktk.zip files.
+
+_COMPRESSION_METHODS = {
+    'stored': zipfile.ZIP_STORED,
+    'deflate': zipfile.ZIP_DEFLATED,
+    'lzma': zipfile.ZIP_LZMA,
+}
+
+
+def save(filename: str, variable: Any, *,
+         compression: str = 'deflate',
+         compresslevel: Optional[int] = None,
+         memory_map: bool = False) -> None:
     """
     Save a variable to a ktk.zip file.
 
-    A ktk.zip file is a zipped folder containing two files:
+    A ktk.zip file is a zipped folder containing:
 
     - metadata.json, which includes save date, user, etc.
-    - data.json, which includes the data.
+    - data.json, which includes the data, except numpy arrays.
+    - arrays/0.npy, arrays/1.npy, etc., which include the numpy arrays
+      referenced from data.json, in numpy's binary npy format.
 
     The following classes are supported:
 
@@ -76,24 +101,68 @@ def save(filename: str, variable: Any) -> None:
 
     Tuples are also supported but will be loaded back as lists, without
     warning.
+
+    The dtype and shape of numpy arrays, including TimeSeries' time and
+    data, are kept exactly. Arrays of Python objects are the exception:
+    they are stored as lists in data.json.
+
+    Parameters
+    ----------
+    filename
+        The path of the zip file to save.
+    variable
+        The variable to save.
+    compression
+        Optional. The compression method: 'stored' (no compression),
+        'deflate' or 'lzma'. 'stored' is the fastest and 'lzma' gives the
+        smallest files. Default is 'deflate'.
+    compresslevel
+        Optional. The compression level: 0 to 9 for 'deflate'. It has no
+        effect for the other methods. Default is None, which uses the
+        method's default level.
+    memory_map
+        Optional. True to store the arrays uncompressed and aligned in the
+        zip file, so that they can be memory-mapped using
+        ktk.load(filename, memory_map=True). The file is larger, but the
+        arrays can then be shared between processes and paged in by the
+        operating system only when they are accessed. Default is False.
+
+    Note
+    ----
+    The file is first written under a temporary name in the destination
+    folder, then renamed to filename. The rename is atomic, so that
+    concurrent saves and loads never see a partially written file.
     """
+    try:
+        compress_type = _COMPRESSION_METHODS[compression]
+    except KeyError:
+        raise ValueError(
+            "compression must be 'stored', 'deflate' or 'lzma'.")
+
+    arrays = []  # type: List[np.ndarray]
 
     class CustomEncoder(json.JSONEncoder):
         def default(self, obj):
             if isinstance(obj, np.ndarray):
+                if obj.dtype.hasobject:
+                    return {'class__': 'numpy.array',
+                            'value': obj.tolist()}
+                # Reference the array, which is saved as a npy member.
+                member = f'arrays/{len(arrays)}.npy'
+                arrays.append(obj)
                 return {'class__': 'numpy.array',
-                        'value': obj.tolist()}
+                        'member': member}
 
             elif str(type(obj)) == \
                     "<class 'kineticstoolkit.timeseries.TimeSeries'>":
                 out = {}
                 out['class__'] = 'ktk.TimeSeries'
-                out['time'] = obj.time.tolist()
+                out['time'] = obj.time
                 out['time_info'] = obj.time_info
                 out['data_info'] = obj.data_info
                 out['data'] = {}
                 for key in obj.data:
-                    out['data'][key] = obj.data[key].tolist()
+                    out['data'][key] = obj.data[key]
                 out['events'] = []
                 for event in obj.events:
                     out['events'].append({
@@ -127,6 +196,13 @@ def save(filename: str, variable: Any) -> None:
                         'imag': obj.imag,
                         }
 
+            # Other containers, e.g., lazily loaded dicts and lists
+            elif isinstance(obj, Mapping):
+                return dict(obj)
+
+            elif isinstance(obj, MutableSequence):
+                return list(obj)
+
             else:
                 return super().default(obj)
 
@@ -144,99 +220,158 @@ def save(filename: str, variable: Any) -> None:
         'Software': 'Kinetics Toolkit',
         'Version': kineticstoolkit.config.version,
         'Computer': computer,
-        'FileFormat': 1.0,
+        'FileFormat': 2.0,
         'SaveDate': now.strftime('%Y-%m-%d'),
         'SaveTime': now.strftime('%H:%M:%S'),
         'User': getpass.getuser(),
     }
 
-    # Save
-    temp_folder = kineticstoolkit.config.temp_folder + \
-        '/save' + str(time.time())
+    # Save in a temporary file in the destination folder
+    fid, temp_filename = tempfile.mkstemp(
+        prefix='.' + os.path.basename(filename) + '.', suffix='.tmp',
+        dir=os.path.dirname(os.path.abspath(filename)))
+    os.close(fid)
 
     try:
-        shutil.rmtree(temp_folder)
-    except:
-        pass
-    os.mkdir(temp_folder)
+        with zipfile.ZipFile(temp_filename, 'w', compression=compress_type,
+                             compresslevel=compresslevel) as archive:
+            archive.writestr('metadata.json',
+                             json.dumps(metadata, indent='\t'))
+
+            # Stream the JSON encoder's output directly in the archive.
+            with io.TextIOWrapper(
+                    archive.open('data.json', 'w', force_zip64=True),
+                    encoding='utf-8') as fid:
+                json.dump(variable, fid, cls=CustomEncoder, indent='\t')
+
+            for i_array, array in enumerate(arrays):
+                _write_array_member(
+                    archive, f'arrays/{i_array}.npy', array,
+                    compress_type=(zipfile.ZIP_STORED if memory_map
+                                   else compress_type))
+
+        # mkstemp creates the file with mode 0600. Give it the mode of the
+        # file it replaces, or the default mode of new files.
+        try:
+            mode = stat.S_IMODE(os.stat(filename).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(temp_filename, mode)
+
+        os.replace(temp_filename, filename)
+
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+
+def _write_array_member(archive, member, array, *, compress_type):
+    """
+    Write a numpy array as a npy member of a zip archive.
+
+    Compressed members use the archive's compression method and level.
+    Uncompressed members are aligned: their local header is padded with an
+    extra field so that the npy member, and therefore the array data that
+    follows the 64-byte npy header, starts on a 64-byte boundary of the zip
+    file. The zip64 extension is always used so that the local header size
+    is known in advance.
+    """
+    if compress_type != zipfile.ZIP_STORED:
+        with archive.open(member, 'w', force_zip64=True) as fid:
+            np.lib.format.write_array(fid, array, allow_pickle=False)
+        return
+
+    zinfo = zipfile.ZipInfo(member, date_time=time.localtime()[0:6])
+    zinfo.compress_type = compress_type
+
+    header_size = 30 + len(member.encode()) + 20  # 20 for zip64
+    padding = -(archive.start_dir + header_size) % _ALIGNMENT
+    if 0 < padding < 4:  # An extra field takes at least 4 bytes.
+        padding += _ALIGNMENT
+    if padding > 0:
+        zinfo.extra = (struct.pack('<HH', 0xD935, padding - 4) +
+                       bytes(padding - 4))
 
-    with open(temp_folder + '/metadata.json', "w") as fid:
-        json.dump(metadata, fid, indent='\t')
+    with archive.open(zinfo, 'w', force_zip64=True) as fid:
+        np.lib.format.write_array(fid, array, allow_pickle=False)
 
-    with open(temp_folder + '/data.json', "w") as fid:
-        json.dump(variable, fid, cls=CustomEncoder, indent='\t')
 
-    shutil.make_archive(temp_folder, 'zip', temp_folder)
-    os.rename(temp_folder + '.zip', filename)
-    shutil.rmtree(temp_folder)
+def _legacy_tree(names):
+    """
+    Build the folder tree of a legacy ktk.zip archive from its member names.
+
+    Folders are returned as nested dicts, and files as their member name.
+    """
+    tree = {}  # type: Dict[str, Any]
+    for name in names:
+        parts = name.rstrip('/').split('/')
+        node = tree
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        if name.endswith('/'):
+            node.setdefault(parts[-1], {})
+        else:
+            node[parts[-1]] = name
+    return tree
+
 
+def _read_legacy_csv(archive, member, **kwargs):
+    """Read a tab-separated file of a legacy ktk.zip archive."""
+    with archive.open(member) as fid:
+        return pd.read_csv(fid, sep='\t', quoting=csv.QUOTE_NONNUMERIC,
+                           **kwargs)
 
-def _load(filename):
+
+def _load_legacy(archive, name, node):
     """
-    Load the contents of a folder or filename.
+    Load an entry of a legacy ktk.zip archive (without data.json).
 
     This is a deprecated function as ktk.zip is to be removed soon.
 
-    Returns a tuple where the first element is the suffix
-    (.eval.txt, .dict, etc) and the second element is the contents.
+    The entry is read directly from the archive: name is the entry's file or
+    folder name and node is its member name (file) or its subtree (folder),
+    as returned by _legacy_tree. Returns a tuple where the first element is
+    the suffix (.eval.txt, .dict, etc) and the second element is the
+    contents.
     """
 
     # Easiest case:
-    if filename.endswith('.str.txt'):
-        with open(filename, 'r') as fid:
-            return ('.str.txt', fid.read())
+    if name.endswith('.str.txt'):
+        return ('.str.txt', archive.read(node).decode())
 
     # Next easiest:
-    elif filename.endswith('.eval.txt'):
-        with open(filename, 'r') as fid:
-            return ('.eval.txt', literal_eval(fid.read()))
+    elif name.endswith('.eval.txt'):
+        return ('.eval.txt', literal_eval(archive.read(node).decode()))
 
-    elif filename.endswith('.dict'):
+    elif name.endswith('.dict'):
         variable = dict()
-        list_of_files = os.listdir(filename)
-        for subfilename in list_of_files:
-            contents = _load(filename + '/' + subfilename)
-            key = subfilename[0:-len(contents[0])]
+        for subname in node:
+            contents = _load_legacy(archive, subname, node[subname])
+            key = subname[0:len(subname) - len(contents[0])]
             variable[key] = contents[1]
         return ('.dict', variable)
 
-    elif filename.endswith('.list'):
-        variable = list()
-        file_list = os.listdir(filename)
-        indexes = [int(file.split('.')[0]) for file in file_list]
-        sorted_file_list = [x for (_, x) in sorted(zip(indexes, file_list))]
-
-        for file in sorted_file_list:
-            contents = _load(filename + '/' + file)
-            variable.append(contents[1])
-        return ('.list', variable)
-
-    elif filename.endswith('.tuple'):
-        variable = list()
-        file_list = os.listdir(filename)
-        indexes = [int(file.split('.')[0]) for file in file_list]
-        sorted_file_list = [x for (_, x) in sorted(zip(indexes, file_list))]
-
-        for file in sorted_file_list:
-            contents = _load(filename + '/' + file)
-            variable.append(contents[1])
-        return ('.tuple', tuple(variable))
-
-    elif filename.endswith('.ndarray.txt'):
-        dataframe = pd.read_csv(filename, sep='\t',
-                                quoting=csv.QUOTE_NONNUMERIC)
+    elif name.endswith('.list') or name.endswith('.tuple'):
+        sorted_names = sorted(node, key=lambda _: int(_.split('.')[0]))
+        variable = [_load_legacy(archive, subname, node[subname])[1]
+                    for subname in sorted_names]
+        if name.endswith('.list'):
+            return ('.list', variable)
+        else:
+            return ('.tuple', tuple(variable))
+
+    elif name.endswith('.ndarray.txt'):
+        dataframe = _read_legacy_csv(archive, node)
         dict_of_arrays = dataframe_to_dict_of_arrays(dataframe)
         return ('.ndarray.txt', dict_of_arrays['Data'])
 
-    elif filename.endswith('.TimeSeries'):
+    elif name.endswith('.TimeSeries'):
 
-        data = pd.read_csv(filename + '/data.txt',
-                           sep='\t', quoting=csv.QUOTE_NONNUMERIC)
-        events = pd.read_csv(filename + '/events.txt',
-                             sep='\t', quoting=csv.QUOTE_NONNUMERIC)
-        info = pd.read_csv(filename + '/info.txt',
-                           sep='\t', quoting=csv.QUOTE_NONNUMERIC,
-                           index_col=0)
+        data = _read_legacy_csv(archive, node['data.txt'])
+        events = _read_legacy_csv(archive, node['events.txt'])
+        info = _read_legacy_csv(archive, node['info.txt'], index_col=0)
 
         out = TimeSeries()
 
@@ -248,43 +383,98 @@ def _load(filename):
 
         # EVENTS
         # ------
-        for i_event in range(0, len(events)):
-            out.add_event(events.time[i_event], events.name[i_event])
+        out.events = [
+            TimeSeriesEvent(event_time, event_name)
+            for (event_time, event_name) in
+            zip(events['time'].tolist(), events['name'].tolist())]
 
         # INFO
         # ----
-        n_rows = len(info)
-        row_names = list(info.index)
-        for column_name in info.columns:
-            for i_row in range(0, n_rows):
-                one_info = info[column_name][i_row]
-                if str(one_info).lower() != 'nan':
-                    if column_name == 'time':
-                        out.time_info[row_names[i_row]] = one_info
-                    else:
-                        out.add_data_info(column_name, row_names[i_row],
-                                          one_info)
+        # Each column is a data key (or time) and each row is an info key.
+        for (column_name, column) in info.to_dict().items():
+            column = {row_name: column[row_name] for row_name in column
+                      if str(column[row_name]).lower() != 'nan'}
+            if column_name == 'time':
+                out.time_info.update(column)
+            elif len(column) > 0:
+                out.data_info[column_name] = column
 
         return ('.TimeSeries', out)
 
     else:
-        warnings.warn(f'Could not load contents in {filename}')
+        warnings.warn(f'Could not load contents in {name}')
         return ('', None)
 
 
-def _load_object_hook(obj):
+def _read_array_member(archive, member, memory_map=False):
+    """
+    Read a numpy array saved as a npy member of a zip archive.
+
+    If memory_map is True and the member is uncompressed, a read-only
+    np.memmap that points directly into the zip file is returned.
+    """
+    if memory_map:
+        array = _memory_map_array_member(archive, member)
+        if array is not None:
+            return array
+
+    with archive.open(member) as fid:
+        return np.lib.format.read_array(fid, allow_pickle=False)
+
+
+def _memory_map_array_member(archive, member):
+    """Memory-map an uncompressed npy member, or return None if impossible."""
+    zinfo = archive.getinfo(member)
+    if zinfo.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    with open(archive.filename, 'rb') as fid:
+        # Skip the member's local header
+        fid.seek(zinfo.header_offset + 26)
+        name_length, extra_length = struct.unpack('<HH', fid.read(4))
+        fid.seek(name_length + extra_length, os.SEEK_CUR)
+
+        # Read the npy header
+        version = np.lib.format.read_magic(fid)
+        if version == (1, 0):
+            header = np.lib.format.read_array_header_1_0(fid)
+        elif version == (2, 0):
+            header = np.lib.format.read_array_header_2_0(fid)
+        else:
+            return None
+        shape, fortran_order, dtype = header
+        offset = fid.tell()
+
+    if dtype.hasobject or np.prod(shape) == 0:
+        return None
+
+    return np.memmap(archive.filename, dtype=dtype, mode='r', offset=offset,
+                     shape=shape, order='F' if fortran_order else 'C')
+
+
+def _load_object_hook(obj, archive=None, memory_map=False):
+    """
+    Decode the classes saved by ktk.save.
+
+    Arrays that are saved as npy members (FileFormat 2.0) are read from
+    archive, while arrays that are saved as lists (FileFormat 1.0) are
+    converted from these lists.
+    """
     if 'class__' in obj:
         to_class = obj['class__']
         if to_class == 'numpy.array':
-            return np.array(obj['value'])
+            if 'member' in obj:
+                return _read_array_member(archive, obj['member'], memory_map)
+            else:
+                return np.array(obj['value'])
 
         elif to_class == 'ktk.TimeSeries':
             out = TimeSeries()
-            out.time = np.array(obj['time'])
+            out.time = np.asarray(obj['time'])
             out.time_info = obj['time_info']
             out.data_info = obj['data_info']
             for key in obj['data']:
-                out.data[key] = np.array(obj['data'][key])
+                out.data[key] = np.asarray(obj['data'][key])
             for event in obj['events']:
                 out.add_event(event['time'], event['name'])
             return out
@@ -314,61 +504,293 @@ def _load_object_hook(obj):
         return obj
 
 
-def _load_ktk_zip(filename, include_metadata=False):
-    """Read the ktk.zip file format."""
+def _decode_tree(node, archive=None):
+    """Decode a parsed data.json node and all its children."""
+    if isinstance(node, list):
+        return [_decode_tree(item, archive) for item in node]
+    elif isinstance(node, dict):
+        return _load_object_hook(
+            {key: _decode_tree(node[key], archive) for key in node},
+            archive)
+    else:
+        return node
+
+
+def _nbytes(value):
+    """Return the memory used by a decoded value, for caching purposes."""
+    if isinstance(value, np.memmap):
+        return 0
+    elif isinstance(value, np.ndarray):
+        return value.nbytes
+    elif isinstance(value, pd.DataFrame):
+        return int(value.memory_usage().sum())
+    elif isinstance(value, pd.Series):
+        return int(value.memory_usage())
+    else:
+        return 0
 
-    archive = zipfile.ZipFile(filename, 'r')
-    try:
-        data = json.loads(archive.read('data.json').decode(),
-                          object_hook=_load_object_hook)
 
-        if include_metadata:
-            metadata = json.loads(archive.read('metadata.json').decode(),
-                                  object_hook=_load_object_hook)
-            return data, metadata
+class _Undecoded():
+    """Wrap a data.json node that has not been decoded yet."""
 
+    __slots__ = ['node']
+
+    def __init__(self, node):
+        self.node = node
+
+
+class _LazyArchive():
+    """
+    Decode the contents of a ktk.zip archive on demand.
+
+    Decoded arrays are read-only and are kept in a least-recently-used
+    cache. When the arrays in this cache exceed cache_size bytes, the least
+    recently used ones are evicted, and will be decoded again from the
+    archive the next time they are accessed. Other decoded objects (proxies,
+    TimeSeries, etc.) may be modified and are therefore never evicted: they
+    are kept by the proxy that contains them.
+    """
+
+    def __init__(self, filename: str, cache_size: int,
+                 memory_map: bool = False):
+        self.filename = filename
+        self.cache_size = cache_size
+        self.memory_map = memory_map
+        self._cache = OrderedDict()  # type: OrderedDict[int, Any]
+        self._cache_nbytes = 0
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # The archive is read-only and is shared by every copy.
+        return self
+
+    def __getstate__(self):
+        return {'filename': self.filename, 'cache_size': self.cache_size,
+                'memory_map': self.memory_map}
+
+    def __setstate__(self, state):
+        self.__init__(state['filename'], state['cache_size'],
+                      state['memory_map'])
+
+    def decode(self, node):
+        """Decode a node, deferring the decoding of its children."""
+        if isinstance(node, list):
+            return _LazyList(self, node)
+        elif isinstance(node, dict) and 'class__' not in node:
+            return _LazyDict(self, node)
+        elif isinstance(node, dict) and node['class__'] == 'numpy.array':
+            return self.decode_array(node)
+        elif isinstance(node, dict):
+            return self._decode_object(node)
         else:
-            return data
+            return node
+
+    def decode_array(self, node):
+        """Decode a node that contains an array (TimeSeries time or data)."""
+        return self._cached(node, self._decode_array)
+
+    def _cached(self, node, function):
+        key = id(node)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        value = function(node)
+
+        with self._lock:
+            self._cache[key] = value
+            self._cache_nbytes += _nbytes(value)
+            while (self._cache_nbytes > self.cache_size and
+                    len(self._cache) > 1):
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_nbytes -= _nbytes(evicted)
+        return value
+
+    def _decode_array(self, node):
+        if isinstance(node, dict) and 'member' in node:
+            with zipfile.ZipFile(self.filename, 'r') as archive:
+                array = _read_array_member(archive, node['member'],
+                                           self.memory_map)
+        elif isinstance(node, dict):
+            array = np.array(node['value'])
+        else:
+            array = np.array(node)
+        array.flags.writeable = False
+        return array
 
-    except Exception:
-        # No data.json. It seems to be the old format.
+    def _decode_object(self, node):
+        if node['class__'] == 'ktk.TimeSeries':
+            out = TimeSeries()
+            out.time = self.decode_array(node['time'])
+            out.time_info = _decode_tree(node['time_info'])
+            out.data_info = _decode_tree(node['data_info'])
+            out.data = _LazyDict(self, node['data'],  # type: ignore
+                                 decode=self.decode_array)
+            for event in node['events']:
+                out.add_event(event['time'], event['name'])
+            return out
 
-        basename = os.path.basename(filename)
-        temp_folder_name = kineticstoolkit.config.temp_folder + '/' + basename
+        else:
+            with zipfile.ZipFile(self.filename, 'r') as archive:
+                return _decode_tree(node, archive)
 
-        # We will rename the folder to .dict to uniformize loading using _load
-        # if needed.
-        new_temp_folder_name = (
-            temp_folder_name[0:-len('.ktk.zip')] + '.dict')
 
-        try:
-            shutil.rmtree(temp_folder_name)
-        except Exception:
-            pass
-        try:
-            shutil.rmtree(new_temp_folder_name)
-        except Exception:
-            pass
+_keep_decoded_lock = threading.Lock()
+
 
-        os.mkdir(temp_folder_name)
-        shutil.unpack_archive(filename, extract_dir=temp_folder_name)
+def _keep_decoded(items, key, value):
+    """
+    Store a decoded value in a proxy's items, unless it is an array.
 
-        new_temp_folder_name = (
-            temp_folder_name[0:-len('.ktk.zip')] + '.dict')
+    Arrays are not stored, so that they can be evicted from the archive's
+    cache. If another thread already stored the same item, this item is
+    returned instead.
+    """
+    if isinstance(value, np.ndarray):
+        return value
+    with _keep_decoded_lock:
+        if isinstance(items[key], _Undecoded):
+            items[key] = value
+        return items[key]
 
-        os.rename(temp_folder_name, new_temp_folder_name)
 
-        variable = _load(new_temp_folder_name)[1]
+class _LazyDict(MutableMapping):
+    """
+    Dict whose values are decoded from a ktk.zip archive when accessed.
 
-        shutil.rmtree(new_temp_folder_name)
+    Values that are assigned are stored as in a normal dict. Decoded values
+    other than arrays are also stored, so that their modifications are
+    kept. Copying or deep-copying returns a normal dict.
+    """
 
-        # Return the entry that corresponds to the contents
-        for key in variable:
-            if key != 'metadata':
-                return variable[key]
+    def __init__(self, archive: _LazyArchive, nodes: Dict[str, Any], *,
+                 decode: Optional[Callable] = None):
+        self._archive = archive
+        self._decode = archive.decode if decode is None else decode
+        self._items = {key: _Undecoded(nodes[key]) for key in nodes}
+
+    def __getitem__(self, key):
+        value = self._items[key]
+        if isinstance(value, _Undecoded):
+            return _keep_decoded(self._items, key, self._decode(value.node))
+        else:
+            return value
+
+    def __setitem__(self, key, value):
+        self._items[key] = value
+
+    def __delitem__(self, key):
+        del self._items[key]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return f'<lazy dict with {len(self)} entries>'
+
+    def __deepcopy__(self, memo):
+        return {key: deepcopy(self[key], memo) for key in self}
+
+    def copy(self):
+        return dict(self)
 
 
-def load(filename: str) -> Any:
+class _LazyList(MutableSequence):
+    """
+    List whose items are decoded from a ktk.zip archive when accessed.
+
+    Items that are assigned are stored as in a normal list. Decoded items
+    other than arrays are also stored, so that their modifications are
+    kept. Copying or deep-copying returns a normal list.
+    """
+
+    def __init__(self, archive: _LazyArchive, nodes: List[Any]):
+        self._archive = archive
+        self._items = [_Undecoded(node) for node in nodes]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        value = self._items[index]
+        if isinstance(value, _Undecoded):
+            return _keep_decoded(self._items, index,
+                                 self._archive.decode(value.node))
+        else:
+            return value
+
+    def __setitem__(self, index, value):
+        self._items[index] = value
+
+    def __delitem__(self, index):
+        del self._items[index]
+
+    def __len__(self):
+        return len(self._items)
+
+    def insert(self, index, value):
+        self._items.insert(index, value)
+
+    def __repr__(self):
+        return f'<lazy list of {len(self)} items>'
+
+    def __eq__(self, other):
+        return list(self) == other
+
+    def __deepcopy__(self, memo):
+        return [deepcopy(item, memo) for item in self]
+
+    def copy(self):
+        return list(self)
+
+
+def _load_ktk_zip(filename, include_metadata=False, *, lazy=False,
+                  cache_size=0, memory_map=False):
+    """Read the ktk.zip file format."""
+
+    with zipfile.ZipFile(filename, 'r') as archive:
+
+        if 'data.json' not in archive.namelist():
+            # No data.json. It seems to be the old format.
+            variable = _load_legacy(
+                archive, '.dict', _legacy_tree(archive.namelist()))[1]
+
+            # Return the entry that corresponds to the contents
+            data = None
+            for key in variable:
+                if key != 'metadata':
+                    data = variable[key]
+                    break
+
+            if include_metadata:
+                return data, variable.get('metadata')
+            else:
+                return data
+
+        if lazy:
+            manifest = json.loads(archive.read('data.json').decode())
+            return _LazyArchive(filename, cache_size,
+                                memory_map).decode(manifest)
+
+        data = json.loads(archive.read('data.json').decode(),
+                          object_hook=lambda obj: _load_object_hook(
+                              obj, archive, memory_map))
+
+        if include_metadata:
+            metadata = json.loads(archive.read('metadata.json').decode(),
+                                  object_hook=_load_object_hook)
+            return data, metadata
+
+        else:
+            return data
+
+
+def load(filename: str, *, lazy: bool = False,
+         cache_size: int = 256 * 1024 ** 2,
+         memory_map: bool = False) -> Any:
     """
     Load a ktk.zip file.
 
@@ -378,11 +800,34 @@ def load(filename: str) -> Any:
     ----------
     filename : str
         The path of the zip file to load.
+    lazy
+        Optional. True to decode the contents only when they are accessed.
+        See note below. Default is False.
+    cache_size
+        Optional. In lazy mode, the maximal size in bytes of the decoded
+        arrays kept in memory. Default is 256 MB.
+    memory_map
+        Optional. True to return the arrays that have been saved using
+        ktk.save(filename, variable, memory_map=True) as read-only np.memmap
+        objects that point directly into the zip file, instead of reading
+        them in memory. Arrays that have been saved compressed are read
+        normally. Default is False.
 
     Returns
     -------
     Any
         The loaded variable.
+
+    Note
+    ----
+    The lazy mode is experimental and has been introduced in version 0.4.
+    In lazy mode, dicts and lists are returned as proxies that
+    only decode an item when it is accessed, and the data of TimeSeries is
+    read from the archive only when a data key is accessed. This is useful
+    to inspect a single signal or trial of a large file. Decoded arrays are
+    cached, and the least recently used ones are evicted when the cache
+    exceeds cache_size. Arrays obtained in lazy mode are read-only; copy
+    the proxies or the TimeSeries to obtain normal, modifiable objects.
     """
 
     # NOTE: THIS FUNCTION CAN ALSO LOAD MAT FILES, BUT THIS IS A TRANSITIONAL
@@ -395,7 +840,8 @@ def load(filename: str) -> Any:
         raise ValueError('filename must be a string.')
 
     if filename.lower().endswith('.zip'):
-        return _load_ktk_zip(filename)
+        return _load_ktk_zip(filename, lazy=lazy, cache_size=cache_size,
+                             memory_map=memory_map)
 
     elif filename.lower().endswith('.mat'):
         return _loadmat(filename)
@@ -404,6 +850,204 @@ def load(filename: str) -> Any:
         raise ValueError('The file must be either zip or mat.')
 
 
+@unstable
+def upgrade_legacy_files(folder: str, *, workers: int = 1,
+                         verbose: bool = False) -> List[str]:
+    """
+    Convert every legacy ktk.zip file of a folder to the current format.
+
+    The folder and its subfolders are searched for ktk.zip files that were
+    saved with the legacy format (folders of text files, without data.json).
+    Each of these files is loaded then saved again in place using ktk.save.
+    Files that are already in the current format are left untouched.
+
+    Parameters
+    ----------
+    folder
+        The folder to search for legacy ktk.zip files.
+    workers
+        Optional. Number of files to convert concurrently. Default is 1 (no
+        concurrency).
+    verbose
+        Optional. Set to True to print each converted file.
+
+    Returns
+    -------
+    List[str]
+        The converted files.
+
+    Note
+    ----
+    Files that cannot be converted generate a warning and are left
+    untouched. Since ktk.save writes atomically, an interrupted conversion
+    never leaves a partially written file.
+    """
+    filenames = []
+    for (root, _, files) in os.walk(folder):
+        for file in sorted(files):
+            if file.lower().endswith('.ktk.zip'):
+                filenames.append(os.path.join(root, file))
+
+    def upgrade_one(filename: str) -> bool:
+        """Convert one file if it is a legacy file."""
+        with zipfile.ZipFile(filename, 'r') as archive:
+            if 'data.json' in archive.namelist():
+                return False
+        save(filename, _load_ktk_zip(filename))
+        return True
+
+    converted = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(upgrade_one, filename): filename
+                   for filename in filenames}
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                if future.result():
+                    converted.append(filename)
+                    if verbose is True:
+                        print(f'Converted {filename}.')
+            except Exception as error:
+                warnings.warn(f'Could not convert {filename}: {error}')
+
+    return sorted(converted)
+
+
+@dataclass
+class LoadResult():
+    """
+    Result of reading one file with ktk.load_many.
+
+    Attributes
+    ----------
+    filename
+        The file that has been read.
+    contents
+        The contents of the file, or None if it could not be read.
+    error
+        The exception raised while reading the file, or None.
+    duration
+        The time spent reading the file, in seconds.
+
+    """
+
+    filename: str
+    contents: Any = None
+    error: Optional[Exception] = None
+    duration: float = 0.0
+
+
+def _read_any_file(filename: str) -> Any:
+    """Read a file using the reader that corresponds to its extension."""
+    # Imported here since these modules import the toplevel namespace.
+    import kineticstoolkit.kinematics as kinematics
+    import kineticstoolkit.pushrimkinetics as pushrimkinetics
+
+    lower_filename = filename.lower()
+    if lower_filename.endswith('.zip') or lower_filename.endswith('.mat'):
+        return load(filename)
+    elif lower_filename.endswith('.c3d'):
+        return kinematics.read_c3d_file(filename)
+    elif lower_filename.endswith('.n3d'):
+        return kinematics.read_n3d_file(filename)
+    elif lower_filename.endswith('.csv'):
+        return pushrimkinetics.read_file(filename, file_format='smartwheel')
+    elif lower_filename.endswith('.txt'):
+        return pushrimkinetics.read_file(filename,
+                                         file_format='smartwheeltxt')
+    else:
+        raise ValueError(f'Unsupported file extension: {filename}')
+
+
+def _read_one_file(filename: str,
+                   reader: Optional[Callable[[str], Any]]) -> LoadResult:
+    """Read one file and return its contents or error with its duration."""
+    start_time = time.perf_counter()
+    try:
+        if reader is None:
+            contents = _read_any_file(filename)
+        else:
+            contents = reader(filename)
+        error = None
+    except Exception as exception:
+        contents = None
+        error = exception
+    return LoadResult(filename, contents, error,
+                      time.perf_counter() - start_time)
+
+
+@unstable
+def load_many(filenames: Sequence[str], *, workers: int = 1,
+              ordered: bool = True, processes: bool = False,
+              reader: Optional[Callable[[str], Any]] = None
+              ) -> Iterator[LoadResult]:
+    """
+    Read many files concurrently.
+
+    Each file is read using the function that corresponds to its extension:
+
+    - .zip, .mat: ktk.load
+    - .c3d: ktk.kinematics.read_c3d_file
+    - .n3d: ktk.kinematics.read_n3d_file
+    - .csv: ktk.pushrimkinetics.read_file (SmartWheel CSV file)
+    - .txt: ktk.pushrimkinetics.read_file (SmartWheel SD-Card TXT file)
+
+    Parameters
+    ----------
+    filenames
+        The files to read.
+    workers
+        Optional. Number of files to read concurrently. Default is 1 (no
+        concurrency).
+    ordered
+        Optional. True to yield the results in the order of filenames,
+        False to yield them as soon as they are read. Default is True.
+    processes
+        Optional. True to read the files in a pool of processes instead of
+        a pool of threads. This is faster for files whose decoding is
+        mostly done in Python, at the cost of transferring the contents
+        between processes. Default is False.
+    reader
+        Optional. A function that reads a file and returns its contents, to
+        use instead of the default readers. When processes is True, this
+        function must be defined at the module level.
+
+    Returns
+    -------
+    Iterator[LoadResult]
+        One LoadResult per file. A file that cannot be read does not stop
+        the batch: its result holds the error instead of the contents.
+
+    Example
+    -------
+    >>> results = list(ktk.load_many(filenames, workers=4))  # doctest: +SKIP
+    >>> contents = [result.contents for result in results]  # doctest: +SKIP
+    >>> total_duration = sum(result.duration for result in results)
+    ... # doctest: +SKIP
+
+    """
+    if processes:
+        executor = ProcessPoolExecutor(
+            max_workers=workers)  # type: Executor
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    with executor:
+        futures = [executor.submit(_read_one_file, filename, reader)
+                   for filename in filenames]
+        try:
+            if ordered:
+                for future in futures:
+                    yield future.result()
+            else:
+                for future in as_completed(futures):
+                    yield future.result()
+        finally:
+            # Do not wait for the remaining files if the iteration stops.
+            for future in futures:
+                future.cancel()
+
+
 def _loadmat(filename):
     """
     Load a Matlab's MAT file.
@@ -34,11 +34,12 @@ import numpy as np
 from numpy import sin, cos, pi
 import pandas as pd
 import warnings
-import struct  # to unpack binary data from SmartWheels' txt files
-from typing import Union, Optional, List
+import os
+from typing import Union, Optional, List, Tuple, Iterator
 
 
-def read_file(filename: str, /, file_format: str = '') -> TimeSeries:
+def read_file(filename: str, /, file_format: str = '', *,
+              memory_map: bool = False) -> TimeSeries:
     """
     Read a file containing pushrim kinetics data.
 
@@ -53,6 +54,15 @@ def read_file(filename: str, /, file_format: str = '') -> TimeSeries:
         - 'smartwheeltxt' (SmartWheel SD-Card TXT file)
         - 'racingwheel' (will change)
 
+    memory_map
+        Optional. For 'smartwheeltxt' files, True to memory-map the file
+        instead of reading it completely in memory before decoding it.
+        Default is False.
+
+    See Also
+    --------
+    ktk.pushrimkinetics.read_file_chunks
+
     """
     if file_format == '':
         warnings.warn("file_format will need to be explicitely specified in "
@@ -106,56 +116,16 @@ def read_file(filename: str, /, file_format: str = '') -> TimeSeries:
 
     elif file_format == 'smartwheeltxt':
 
-        data = {'ch1': [], 'ch2': [], 'ch3': [],
-                'ch4': [], 'ch5': [], 'ch6': [], 'angle_ticks': []}
+        (records, tail) = _read_smartwheeltxt_records(
+            filename, memory_map=memory_map)
+        length = records.shape[0] + tail.shape[0]
 
-        length = 0
-        with open(filename, 'rb') as fid:
-
-            while True:
-                try:
-                    _ = fid.read(2)
-                    data['ch1'].append(struct.unpack('h', fid.read(2))[0])
-                    data['ch2'].append(struct.unpack('h', fid.read(2))[0])
-                    data['ch3'].append(struct.unpack('h', fid.read(2))[0])
-                    data['ch4'].append(struct.unpack('h', fid.read(2))[0])
-                    data['ch5'].append(struct.unpack('h', fid.read(2))[0])
-                    data['ch6'].append(struct.unpack('h', fid.read(2))[0])
-                    data['angle_ticks'].append(
-                        struct.unpack('i', fid.read(4))[0])
-                    _ = fid.read(8)
-                    length += 1
-                except Exception:
-                    break
-
-        ch1 = np.array(data['ch1'][1:length])  # Remove 1st sample to be
-        ch2 = np.array(data['ch2'][1:length])  # consistent with CSV file
-        ch3 = np.array(data['ch3'][1:length])
-        ch4 = np.array(data['ch4'][1:length])
-        ch5 = np.array(data['ch5'][1:length])
-        ch6 = np.array(data['ch6'][1:length])
-        angle_ticks = np.array(data['angle_ticks'][1:length])
-
-        # Keep only 12 least significant bytes
-        ch1 = np.mod(ch1, 2 ** 12)
-        ch2 = np.mod(ch2, 2 ** 12)
-        ch3 = np.mod(ch3, 2 ** 12)
-        ch4 = np.mod(ch4, 2 ** 12)
-        ch5 = np.mod(ch5, 2 ** 12)
-        ch6 = np.mod(ch6, 2 ** 12)
-
-        # Convert angle in radian
-        angle = angle_ticks / 4096 * 2 * np.pi
+        # Remove 1st sample to be consistent with CSV file
+        (channels, angle) = _decode_smartwheeltxt_range(
+            records, tail, 1, length)
 
-        ts = TimeSeries(
-            time=np.linspace(0, (length - 1) / 240, length - 1))
-        ts.data['Channels'] = np.concatenate(
-            [ch1[:, np.newaxis],
-             ch2[:, np.newaxis],
-             ch3[:, np.newaxis],
-             ch4[:, np.newaxis],
-             ch5[:, np.newaxis],
-             ch6[:, np.newaxis]], axis=1)
+        ts = TimeSeries(time=_get_smartwheeltxt_time(length, 1, length))
+        ts.data['Channels'] = channels
         ts.data['Angle'] = angle
 
         ts.add_data_info('Channels', 'Unit', 'raw')
@@ -167,6 +137,163 @@ def read_file(filename: str, /, file_format: str = '') -> TimeSeries:
     return ts
 
 
+# Record of a SmartWheel SD-Card TXT file: 2 unused bytes, 6 channels, the
+# wheel angle in ticks, then 8 unused bytes.
+_SMARTWHEELTXT_RECORD = np.dtype([
+    ('header', 'V2'),
+    ('channels', '<i2', (6,)),
+    ('angle_ticks', '<i4'),
+    ('footer', 'V8'),
+])
+
+# A last, truncated record is still valid if it includes the angle.
+_SMARTWHEELTXT_MIN_RECORD_SIZE = 18
+
+
+def _read_smartwheeltxt_records(
+        filename: str, /, *,
+        memory_map: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Read the raw records of a SmartWheel SD-Card TXT file.
+
+    Returns a tuple (records, tail) of structured arrays of
+    _SMARTWHEELTXT_RECORD. records contains the complete records, and is a
+    memmap if memory_map is True. tail contains the last, truncated record
+    if it is valid, or is empty. They are not concatenated, which would
+    copy a memory-mapped file in memory.
+
+    """
+    record_size = _SMARTWHEELTXT_RECORD.itemsize
+    file_size = os.path.getsize(filename)
+    n_records = file_size // record_size
+    tail_size = file_size % record_size
+
+    if memory_map and n_records > 0:
+        records = np.memmap(filename, dtype=_SMARTWHEELTXT_RECORD,
+                            mode='r', shape=(n_records,))
+    else:
+        records = np.fromfile(filename, dtype=_SMARTWHEELTXT_RECORD,
+                              count=n_records)
+
+    if tail_size >= _SMARTWHEELTXT_MIN_RECORD_SIZE:
+        with open(filename, 'rb') as fid:
+            fid.seek(n_records * record_size)
+            tail = np.frombuffer(fid.read().ljust(record_size, b'\x00'),
+                                 dtype=_SMARTWHEELTXT_RECORD)
+    else:
+        tail = np.zeros(0, dtype=_SMARTWHEELTXT_RECORD)
+
+    return (records, tail)
+
+
+def _decode_smartwheeltxt_records(
+        records: np.ndarray, /) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode raw SmartWheel SD-Card TXT records.
+
+    Returns the channels (Nx6, keeping only the 12 least significant bits)
+    and the wheel angle in radians (N).
+
+    """
+    channels = np.bitwise_and(records['channels'], 2 ** 12 - 1).astype(int)
+    angle = records['angle_ticks'] / 4096 * 2 * np.pi
+    return (channels, angle)
+
+
+def _decode_smartwheeltxt_range(
+        records: np.ndarray, tail: np.ndarray, i_start: int, i_stop: int,
+        /) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode the records i_start to i_stop - 1 of a SmartWheel TXT file.
+
+    records and tail are returned by _read_smartwheeltxt_records, and the
+    records of tail follow those of records. Only the decoded values are
+    concatenated.
+
+    """
+    n_records = records.shape[0]
+    (channels, angle) = _decode_smartwheeltxt_records(
+        records[i_start:min(i_stop, n_records)])
+    if i_stop > n_records:
+        (tail_channels, tail_angle) = _decode_smartwheeltxt_records(
+            tail[max(i_start - n_records, 0):i_stop - n_records])
+        channels = np.concatenate([channels, tail_channels])
+        angle = np.concatenate([angle, tail_angle])
+    return (channels, angle)
+
+
+def _get_smartwheeltxt_time(length: int, i_start: int,
+                            i_stop: int) -> np.ndarray:
+    """
+    Get the time of the records i_start to i_stop - 1 of a SmartWheel TXT file.
+
+    The first of the length records is not used, and the time of the others
+    is np.linspace(0, (length - 1) / 240, length - 1). It is computed as
+    np.linspace does, without creating the whole time vector.
+
+    """
+    n_samples = length - 1
+    stop = n_samples / 240
+    if n_samples < 2:
+        return np.zeros(max(i_stop - i_start, 0))
+    time = np.arange(i_start - 1, i_stop - 1) * (stop / (n_samples - 1))
+    if i_stop == length and time.shape[0] > 0:
+        time[-1] = stop
+    return time
+
+
+@unstable
+def read_file_chunks(filename: str, /, file_format: str = 'smartwheeltxt', *,
+                     chunk_size: int = 240 * 60) -> Iterator[TimeSeries]:
+    """
+    Read a file containing pushrim kinetics data, chunk by chunk.
+
+    This function is a generator that reads the file in consecutive
+    TimeSeries of at most chunk_size samples, for files that do not fit in
+    memory. The file is memory-mapped and only the current chunk is decoded.
+
+    Parameters
+    ----------
+    filename
+        Name of the file to open
+    file_format
+        Optional. Format of the file. Only 'smartwheeltxt' (SmartWheel
+        SD-Card TXT file) is currently supported.
+    chunk_size
+        Optional. Maximal number of samples of each chunk. Default is one
+        minute at 240 Hz.
+
+    Yields
+    ------
+    TimeSeries
+        The consecutive chunks, with the same data keys and time as those
+        returned by `ktk.pushrimkinetics.read_file`.
+
+    """
+    if file_format != 'smartwheeltxt':
+        raise ValueError("Only the 'smartwheeltxt' file format can be read "
+                         "by chunks.")
+
+    (records, tail) = _read_smartwheeltxt_records(filename, memory_map=True)
+    length = records.shape[0] + tail.shape[0]
+
+    # Remove 1st sample to be consistent with CSV file
+    for i_start in range(1, length, chunk_size):
+        i_stop = min(i_start + chunk_size, length)
+        (channels, angle) = _decode_smartwheeltxt_range(
+            records, tail, i_start, i_stop)
+
+        ts = TimeSeries(
+            time=_get_smartwheeltxt_time(length, i_start, i_stop))
+        ts.data['Channels'] = channels
+        ts.data['Angle'] = angle
+
+        ts.add_data_info('Channels', 'Unit', 'raw')
+        ts.add_data_info('Angle', 'Unit', 'rad')
+
+        yield ts
+
+
 @unstable
 def find_recovery_indices(Mz: np.ndarray, /) -> np.ndarray:
     """
@@ -196,27 +323,42 @@ def find_recovery_indices(Mz: np.ndarray, /) -> np.ndarray:
     ktk.cycles.detect_cycles
 
     """
-    Mz = Mz.copy()
-
     threshold = 2.24  # (Nm): max tolerance for the remaining values.
 
-    while np.nanmax(Mz) - np.nanmin(Mz) > threshold:
-
-        # Remove 1% of data that are the farthest to the median:
-
-        # Sort data
-        index_to_remove = np.argsort(np.abs(Mz - np.nanmedian(Mz)))
-        sorted_Mz = Mz[index_to_remove]
-        index_to_remove = index_to_remove[~np.isnan(sorted_Mz)]
-
-        # Remove the 1% upper.
-        index_to_remove = index_to_remove[
-            int(0.99*len(index_to_remove))-1:]
-
-        # Assign nan to these data
-        Mz[index_to_remove] = np.nan
-
-    index = ~np.isnan(Mz)
+    if not np.nanmax(Mz) - np.nanmin(Mz) > threshold:
+        return ~np.isnan(Mz)
+
+    # Every iteration removes the 1% of data that are the farthest to the
+    # median. These data are always at both ends of the sorted data, so that
+    # the remaining data are always a contiguous window [lo, hi) of the
+    # data sorted once.
+    sorted_index = np.argsort(Mz, kind='stable')
+    sorted_index = sorted_index[~np.isnan(Mz[sorted_index])]
+    sorted_Mz = Mz[sorted_index]
+
+    lo = 0
+    hi = len(sorted_Mz)
+
+    while hi > lo and sorted_Mz[hi - 1] - sorted_Mz[lo] > threshold:
+
+        # Median of the remaining data
+        n = hi - lo
+        median = 0.5 * (sorted_Mz[lo + (n - 1) // 2] + sorted_Mz[lo + n // 2])
+
+        # Remove the 1% upper. The candidates are the n_remove data at both
+        # ends, whose distances to the median decrease inwards; the farthest
+        # ones are found by sorting these few candidates only.
+        n_remove = n - (int(0.99 * n) - 1)
+        distances = np.concatenate((
+            sorted_Mz[hi - n_remove:hi][::-1] - median,
+            median - sorted_Mz[lo:lo + n_remove]))
+        farthest = np.argsort(-distances, kind='stable')[:n_remove]
+        n_upper = np.count_nonzero(farthest < n_remove)
+        hi -= n_upper
+        lo += n_remove - n_upper
+
+    index = np.zeros(Mz.shape, dtype=bool)
+    index[sorted_index[lo:hi]] = True
 
     return index
 
@@ -295,8 +437,8 @@ def remove_offsets(
     f = f - q @ A
 
     # Make the output timeseries
-    kinetics.data['Forces'][:, 0:3] = f[:, 0:3]
-    kinetics.data['Moments'][:, 0:3] = f[:, 3:6]
+    kinetics._get_writeable_data('Forces')[:, 0:3] = f[:, 0:3]
+    kinetics._get_writeable_data('Moments')[:, 0:3] = f[:, 3:6]
 
     return kinetics
 
@@ -306,7 +448,8 @@ def calculate_forces_and_moments(
         gains: Union[np.ndarray, str],
         offsets: np.ndarray = np.zeros((6)), *,
         transducer: str = 'force_cell',
-        reference_frame: str = 'wheel') -> TimeSeries:
+        reference_frame: str = 'wheel',
+        dtype: type = float) -> TimeSeries:
     """
     Calculate pushrim forces and moments based on raw channel values.
 
@@ -336,6 +479,10 @@ def calculate_forces_and_moments(
         wheel rotation and match the reference frame used by the SmartWheel:
         x anteroposterior, y in the wheel plane, upward for non-camberred
         wheels, and z perpendicular to the wheel plane, outward.
+    dtype
+        Optional. Data type of the calculated forces and moments. Use
+        np.float32 to halve memory usage and speed up the calculation on
+        very long, high-frequency recordings. Default is float.
 
     Returns
     -------
@@ -363,6 +510,9 @@ def calculate_forces_and_moments(
         return _old_calculate_forces_and_moments(kinetics, gains)
 
     # Calculate the forces and moments and add to the output
+    n_frames = kinetics.data['Channels'].shape[0]
+    forces_moments = np.empty((n_frames, 6), dtype=dtype)
+
     if transducer == 'smartwheel':
 
         # Calculate the rotation angle to apply to the calculated kinetics
@@ -373,39 +523,27 @@ def calculate_forces_and_moments(
         else:
             raise ValueError("reference_frame must be 'wheel' or 'hub'")
 
-        # Extract channels and angle
-        ch = kinetics.data['Channels'] - 2048
+        # Extract channels: forces channels (0, 2, 4) and moments channels
+        # (1, 3, 5) of the three beams.
+        ch = kinetics.data['Channels'].astype(dtype) - 2048
+        ch_forces = ch[:, 0::2]
+        ch_moments = ch[:, 1::2]
 
-        # Calculate the forces and moments
-        Fx = gains[0] * (
-            ch[:, 0] * sin(theta) +
-            ch[:, 2] * sin(theta + 2 * pi / 3) +
-            ch[:, 4] * sin(theta + 4 * pi / 3)) + offsets[0]
+        # Calculate the trigonometric terms of each beam only once
+        beam_angles = (theta.astype(dtype)[:, np.newaxis] +
+                       np.array([0, 2 * pi / 3, 4 * pi / 3], dtype=dtype))
+        sin_terms = np.broadcast_to(sin(beam_angles), ch_forces.shape)
+        cos_terms = np.broadcast_to(cos(beam_angles), ch_forces.shape)
 
-        Fy = gains[1] * (
-            ch[:, 0] * cos(theta) +
-            ch[:, 2] * cos(theta + 2 * pi / 3) +
-            ch[:, 4] * cos(theta + 4 * pi / 3)) + offsets[1]
-
-        Fz = gains[2] * (ch[:, 1] + ch[:, 3] + ch[:, 5]) + offsets[2]
-
-        Mx = gains[3] * (
-            ch[:, 1] * sin(theta) +
-            ch[:, 3] * sin(theta + 2 * pi / 3) +
-            ch[:, 5] * sin(theta + 4 * pi / 3)) + offsets[3]
-
-        My = gains[4] * (
-            ch[:, 1] * cos(theta) +
-            ch[:, 3] * cos(theta + 2 * pi / 3) +
-            ch[:, 5] * cos(theta + 4 * pi / 3)) + offsets[4]
-
-        Mz = gains[5] * (ch[:, 0] + ch[:, 2] + ch[:, 4]) + offsets[5]
-        forces_moments = np.block([Fx[:, np.newaxis],
-                                   Fy[:, np.newaxis],
-                                   Fz[:, np.newaxis],
-                                   Mx[:, np.newaxis],
-                                   My[:, np.newaxis],
-                                   Mz[:, np.newaxis]])
+        # Calculate the forces and moments
+        np.einsum('ij,ij->i', ch_forces, sin_terms, out=forces_moments[:, 0])
+        np.einsum('ij,ij->i', ch_forces, cos_terms, out=forces_moments[:, 1])
+        np.sum(ch_moments, axis=1, out=forces_moments[:, 2])
+        np.einsum('ij,ij->i', ch_moments, sin_terms, out=forces_moments[:, 3])
+        np.einsum('ij,ij->i', ch_moments, cos_terms, out=forces_moments[:, 4])
+        np.sum(ch_forces, axis=1, out=forces_moments[:, 5])
+        forces_moments *= np.asarray(gains, dtype=dtype)
+        forces_moments += np.asarray(offsets, dtype=dtype)
 
     elif transducer == 'force_cell':
 
@@ -418,25 +556,24 @@ def calculate_forces_and_moments(
         else:
             raise ValueError("reference_frame must be 'wheel' or 'hub'")
 
-        n_frames = kinetics.data['Channels'].shape[0]
+        # Apply the calibration matrix on every frame at once
+        np.matmul(kinetics.data['Channels'].astype(dtype),
+                  np.asarray(gains, dtype=dtype).T,
+                  out=forces_moments)
+        forces_moments += np.asarray(offsets, dtype=dtype)
 
-        forces_moments = np.empty((n_frames, 6))
-        for i_frame in range(n_frames):
-            forces_moments[i_frame] = (gains @
-                                       kinetics.data['Channels'][i_frame] +
-                                       offsets)
+    else:
+        raise ValueError(f"Unknown transducer {transducer}")
 
     # Format these data in the output timeseries
     kinetics = kinetics.copy()
 
-    kinetics.data['Forces'] = np.concatenate(
-        [forces_moments[:, 0:3], np.zeros((forces_moments.shape[0], 1))],
-        axis=1)
+    kinetics.data['Forces'] = np.zeros((n_frames, 4), dtype=dtype)
+    kinetics.data['Forces'][:, 0:3] = forces_moments[:, 0:3]
     kinetics.add_data_info('Forces', 'Unit', 'N')
 
-    kinetics.data['Moments'] = np.concatenate(
-        [forces_moments[:, 3:6], np.zeros((forces_moments.shape[0], 1))],
-        axis=1)
+    kinetics.data['Moments'] = np.zeros((n_frames, 4), dtype=dtype)
+    kinetics.data['Moments'][:, 0:3] = forces_moments[:, 3:6]
     kinetics.add_data_info('Moments', 'Unit', 'Nm')
 
     return(kinetics)
@@ -667,13 +804,7 @@ def _old_calculate_forces_and_moments(
 
     elif forcecell == 'matrix':
 
-        n_frames = kinetics.data['Channels'].shape[0]
-
-        forces_moments = np.empty((n_frames, 6))
-        for i_frame in range(n_frames):
-            forces_moments[i_frame] = (gains_ @
-                                       kinetics.data['Channels'][i_frame] +
-                                       offsets_)
+        forces_moments = kinetics.data['Channels'] @ gains_.T + offsets_
 
     # Format these data in the output timeseries
     kinetics = kinetics.copy()
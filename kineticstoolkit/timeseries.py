@@ -30,6 +30,7 @@ __license__ = "Apache 2.0"
 
 
 import kineticstoolkit._repr
+import kineticstoolkit.config
 from kineticstoolkit.decorators import unstable, deprecated, directory
 import matplotlib as mpl
 import matplotlib.pyplot as plt
@@ -38,12 +39,18 @@ import scipy as sp
 import pandas as pd
 import limitedinteraction as li
 from dataclasses import dataclass
-from collections.abc import MutableMapping
+from collections.abc import MutableMapping, ItemsView, ValuesView
 
 import warnings
+import json
+import hashlib
+import math
+import threading
+import weakref
 from ast import literal_eval
 from copy import deepcopy
-from typing import Dict, List, Tuple, Any, Union, Optional
+from typing import (
+    Dict, List, Tuple, Any, Union, Optional, Callable, Sequence)
 
 import kineticstoolkit as ktk  # For doctests
 
@@ -301,6 +308,403 @@ def dict_of_arrays_to_dataframe(
     return df_out
 
 
+# Analysis of time arrays by _analyze_time, indexed by id(time).
+_time_analyses = {}  # type: Dict[int, Tuple[Any, Tuple[Any, ...], str]]
+
+# Number of samples compared to detect in-place changes to a time array.
+_TIME_SIGNATURE_SAMPLES = 64
+
+
+# Bytes shared and duplicated by TimeSeries.copy, see get_copy_statistics.
+_copy_statistics = {'shared': 0, 'duplicated': 0}
+
+
+def _nbytes(value: Any) -> int:
+    """Return the size of an array in bytes, or 0 if it is not an array."""
+    return value.nbytes if isinstance(value, np.ndarray) else 0
+
+
+class _SharedArray():
+    """
+    Array shared by the data of several TimeSeries, see TimeSeries.copy.
+
+    The array is read-only while it is shared. Each TimeSeries that holds it
+    gets its own array when it first accesses it: a copy if the array is
+    still held by another TimeSeries (or was read-only in the first place),
+    or the array itself, made writeable again, if this TimeSeries is the
+    last one to hold it.
+    """
+
+    __slots__ = ['array', 'n_holders', 'writeable']
+
+    def __init__(self, array: np.ndarray, n_holders: int):
+        self.array = array
+        self.n_holders = n_holders
+        self.writeable = array.flags.writeable
+        array.flags.writeable = False
+
+    def release(self) -> np.ndarray:
+        """Stop holding the array, and return an array to use instead."""
+        with _shared_arrays_lock:
+            self.n_holders -= 1
+            if self.n_holders > 0 or not self.writeable:
+                array = np.array(self.array)
+                _copy_statistics['duplicated'] += array.nbytes
+                return array
+            self.array.flags.writeable = True
+            return self.array
+
+    def drop(self) -> None:
+        """Stop holding the array without using it."""
+        with _shared_arrays_lock:
+            self.n_holders -= 1
+
+
+_shared_arrays_lock = threading.Lock()
+
+
+class _CopyOnWriteDict(dict):
+    """
+    Data dict of a TimeSeries that shares arrays with other TimeSeries.
+
+    Shared arrays are stored as _SharedArray, and are replaced by their own
+    array when they are accessed. Copying or deep-copying returns a normal
+    dict.
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, _SharedArray):
+            value = value.release()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def __setitem__(self, key, value):
+        old_value = dict.get(self, key)
+        if isinstance(old_value, _SharedArray):
+            old_value.drop()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        old_value = dict.__getitem__(self, key)
+        if isinstance(old_value, _SharedArray):
+            old_value.drop()
+        dict.__delitem__(self, key)
+
+    def __iter__(self):
+        # Also makes dict(self) and {**self} use __getitem__.
+        return dict.__iter__(self)
+
+    def __repr__(self):
+        return repr({key: self._peek(key) for key in self})
+
+    def __del__(self):
+        for value in dict.values(self):
+            if isinstance(value, _SharedArray):
+                value.drop()
+
+    def __deepcopy__(self, memo):
+        return {key: deepcopy(self._peek(key), memo) for key in self}
+
+    def __reduce__(self):
+        return (dict, ({key: self._peek(key) for key in self}, ))
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = self[key]
+        dict.__delitem__(self, key)
+        return value
+
+    def popitem(self):
+        key = next(reversed(self))
+        return (key, self.pop(key))
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+    def copy(self):
+        return {key: self[key] for key in self}
+
+    def _peek(self, key: str) -> Any:
+        """Get an item without accessing it, to read it or to copy it."""
+        value = dict.__getitem__(self, key)
+        return value.array if isinstance(value, _SharedArray) else value
+
+    def _share(self, key: str) -> Any:
+        """Share an item with a new TimeSeries, and return its new item."""
+        value = dict.__getitem__(self, key)
+        if isinstance(value, _SharedArray):
+            with _shared_arrays_lock:
+                value.n_holders += 1
+            _copy_statistics['shared'] += value.array.nbytes
+            return value
+        elif (isinstance(value, np.ndarray) and value.base is None and
+                value.flags.writeable and not value.dtype.hasobject):
+            # An array that owns its data is shared by both TimeSeries.
+            _copy_statistics['shared'] += value.nbytes
+            value = _SharedArray(value, 2)
+            dict.__setitem__(self, key, value)
+            return value
+        else:
+            return _share_if_immutable(value)
+
+
+def _share_if_immutable(value: Any) -> Any:
+    """
+    Share a value with a new TimeSeries if it cannot be modified.
+
+    Arrays that cannot be modified are shared by the new TimeSeries only,
+    which will copy them when it accesses them. Other values, including
+    views of writeable arrays, which could be modified through their base,
+    are deep-copied.
+    """
+    if (isinstance(value, np.ndarray) and not value.dtype.hasobject and
+            _is_immutable(value)):
+        _copy_statistics['shared'] += value.nbytes
+        return _SharedArray(value, 1)
+    else:
+        _copy_statistics['duplicated'] += _nbytes(value)
+        return deepcopy(value)
+
+
+def get_copy_statistics(reset: bool = False) -> Dict[str, int]:
+    """
+    Get the memory shared and duplicated by TimeSeries.copy.
+
+    Parameters
+    ----------
+    reset
+        Optional. True to reset the statistics to zero after reading them.
+
+    Returns
+    -------
+    Dict[str, int]
+        A dict with the keys 'shared' (bytes of arrays shared between copies
+        when kineticstoolkit.config.copy_on_write is True) and 'duplicated'
+        (bytes of arrays actually copied, either by TimeSeries.copy or when
+        a shared array is accessed), since the start of the session or the
+        last reset.
+
+    """
+    statistics = _copy_statistics.copy()
+    if reset:
+        _copy_statistics['shared'] = 0
+        _copy_statistics['duplicated'] = 0
+    return statistics
+
+
+def _get_gap_index(
+        values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the missing samples of a data array.
+
+    Returns a tuple (is_missing, starts, lengths), where is_missing is a
+    boolean array that is True for each sample that contains at least one
+    nan, and starts and lengths are the index and length of each run of
+    consecutive missing samples.
+
+    The gap index is not cached: data arrays can be modified in place at
+    any time, which could not be detected without scanning them again.
+    """
+    # Reduce the dimension of values while keeping the time dimension. A sum
+    # is nan if any of its terms is nan.
+    if values.ndim > 1:
+        is_missing = np.isnan(
+            values.reshape(values.shape[0], -1).sum(axis=1))
+    else:
+        is_missing = np.isnan(values)
+    is_missing = np.asarray(is_missing)
+
+    edges = np.diff(is_missing.astype(np.int8), prepend=0, append=0)
+    starts = np.nonzero(edges == 1)[0]
+    lengths = np.nonzero(edges == -1)[0] - starts
+    return (is_missing, starts, lengths)
+
+
+def _is_immutable(array: np.ndarray) -> bool:
+    """Tell if an array can be modified neither directly nor via its base."""
+    while isinstance(array, np.ndarray):
+        if array.flags.writeable:
+            return False
+        array = array.base
+    return True
+
+
+def _get_time_signature(time: np.ndarray) -> Tuple[Any, ...]:
+    """
+    Summarize the contents of a time array to detect in-place changes.
+
+    Read-only arrays (whose base, if any, is also read-only) cannot change.
+    Other arrays are summarized by their length and by evenly spaced
+    samples, including their first and last samples.
+    """
+    n_samples = time.shape[0]
+    if _is_immutable(time):
+        return (n_samples,)
+    step = max(1, (n_samples - 1) // _TIME_SIGNATURE_SAMPLES)
+    return (n_samples, time[::step].tobytes(), time[-1:].tobytes())
+
+
+def _get_cached_time_analysis(time: np.ndarray) -> Optional[str]:
+    """Return the cached analysis of a time array, or None if not valid."""
+    try:
+        (ref, signature, analysis) = _time_analyses[id(time)]
+    except KeyError:
+        return None
+    if ref() is time and signature == _get_time_signature(time):
+        return analysis
+    return None
+
+
+def _analyze_time(time: np.ndarray) -> str:
+    """
+    Tell if a time array is 'uniform', 'increasing' or 'unsorted'.
+
+    'uniform' and 'increasing' time arrays are monotonic (non-decreasing)
+    and do not contain nans; the sampling of 'uniform' time arrays is also
+    constant. The analysis is cached until the array's signature changes
+    (see _get_time_signature). In-place changes to writeable arrays that
+    leave every sample of the signature unchanged are not detected.
+    """
+    n_samples = np.shape(time)[0] if np.ndim(time) == 1 else 0
+    if n_samples == 0:
+        return 'unsorted'
+
+    analysis = _get_cached_time_analysis(time)
+    if analysis is not None:
+        return analysis
+
+    # A forward slice of a monotonic time array (e.g., the time of a
+    # TimeSeries obtained with copy=False) is also monotonic.
+    base = time.base if isinstance(time, np.ndarray) else None
+    base_analysis = (_get_cached_time_analysis(base)
+                     if isinstance(base, np.ndarray) and base.ndim == 1
+                     else None)
+    if (base_analysis in ('uniform', 'increasing') and
+            time.dtype == base.dtype and time.strides[0] > 0):
+        if (base_analysis == 'uniform' and n_samples > 1 and
+                time[-1] > time[0]):
+            analysis = 'uniform'
+        else:
+            analysis = 'increasing'
+
+    else:
+        diff = np.diff(time)
+        if np.isnan(time[0]) or not np.all(diff >= 0):  # Also False w/ nans
+            analysis = 'unsorted'
+        elif (n_samples > 1 and time[-1] > time[0] and np.allclose(
+                diff, (time[-1] - time[0]) / (n_samples - 1), rtol=1e-6,
+                atol=0)):
+            analysis = 'uniform'
+        else:
+            analysis = 'increasing'
+
+    _set_time_analysis(time, analysis)
+    return analysis
+
+
+def _set_time_analysis(time: np.ndarray, analysis: str) -> None:
+    """Cache the analysis of a non-empty time array."""
+    if not isinstance(time, np.ndarray):
+        return
+    signature = _get_time_signature(time)
+    try:
+        key = id(time)
+        ref = weakref.ref(time, lambda _: _time_analyses.pop(key, None))
+        _time_analyses[key] = (ref, signature, analysis)
+    except TypeError:  # Not weak-referenceable
+        pass
+
+
+def _searchsorted(time: np.ndarray, value: float, side: str,
+                  analysis: str) -> int:
+    """
+    Find the insertion index of value in a monotonic time array.
+
+    Equivalent to np.searchsorted for one finite value, in O(1) for uniform
+    time arrays.
+    """
+    if analysis == 'uniform':
+        n_samples = time.shape[0]
+        position = ((value - time[0]) * (n_samples - 1) /
+                    (time[-1] - time[0]))
+        if side == 'left':
+            index = min(max(math.ceil(position), 0), n_samples)
+            if ((index == 0 or time[index - 1] < value) and
+                    (index == n_samples or time[index] >= value)):
+                return index
+        else:
+            index = min(max(math.floor(position) + 1, 0), n_samples)
+            if ((index == 0 or time[index - 1] <= value) and
+                    (index == n_samples or time[index] > value)):
+                return index
+
+    return int(np.searchsorted(time, value, side))
+
+
+def _indexes_at_times(time: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """Vectorized get_index_at_time for monotonic time and finite times."""
+    n_samples = time.shape[0]
+    index = np.searchsorted(time, times, 'left')
+    lower = np.maximum(index - 1, 0)
+    upper = np.minimum(index, n_samples - 1)
+    # The first index wins ties, as np.argmin.
+    choose_lower = (index == n_samples) | (
+        (index > 0) &
+        (np.abs(time[lower] - times) <= np.abs(time[upper] - times)))
+    return np.where(choose_lower,
+                    np.searchsorted(time, time[lower], 'left'), upper)
+
+
+def _indexes_before_times(time: np.ndarray, times: np.ndarray,
+                          inclusive: bool) -> np.ndarray:
+    """Vectorized get_index_before_time for monotonic time and finite times."""
+    n_samples = time.shape[0]
+    before = np.searchsorted(time, times, 'left') - 1
+    index = np.searchsorted(time, time[np.maximum(before, 0)], 'left')
+    if inclusive:
+        index += 1
+    is_found = (before >= 0) & (index < n_samples)
+    if inclusive:
+        is_found |= times == time[0]
+        index[times == time[0]] = 0
+    return np.where(is_found, index, np.nan)
+
+
+def _indexes_after_times(time: np.ndarray, times: np.ndarray,
+                         inclusive: bool) -> np.ndarray:
+    """Vectorized get_index_after_time for monotonic time and finite times."""
+    n_samples = time.shape[0]
+    index = np.searchsorted(time, times, 'right')
+    is_found = index < n_samples
+    if inclusive:
+        index -= 1
+        is_found &= index >= 0
+        is_found |= times == time[-1]
+        index[times == time[-1]] = n_samples - 1
+    return np.where(is_found, index, np.nan)
+
+
 @dataclass
 class TimeSeriesEvent():
     """
@@ -444,24 +848,32 @@ class TimeSeries():
         True if each attribute of ts is equal to the TimeSeries' attributes.
 
         """
+        if ts is self:
+            return True
+
         if not np.array_equal(self.time, ts.time):
             print('Time is not equal')
             return False
 
-        for data in [self.data, ts.data]:
-            for one_data in data:
-                try:
-                    if not np.isclose(self.data[one_data], ts.data[one_data],
-                                      rtol=1e-15).all():
-                        print(f'{one_data} is not equal')
-                        return False
-                except KeyError:
-                    print(f'{one_data} is missing in one of the TimeSeries')
-                    return False
-                except ValueError:
-                    print(f'{one_data} does not have the same size in both '
-                          'TimeSeries')
+        for one_data in dict.fromkeys([*self.data, *ts.data]):
+            try:
+                self_data = self.data[one_data]
+                ts_data = ts.data[one_data]
+                # Fast path: the same array or exactly the same values.
+                if self_data is ts_data or np.array_equal(self_data,
+                                                          ts_data):
+                    continue
+                if not np.isclose(self_data, ts_data,
+                                  rtol=1e-15).all():
+                    print(f'{one_data} is not equal')
                     return False
+            except KeyError:
+                print(f'{one_data} is missing in one of the TimeSeries')
+                return False
+            except ValueError:
+                print(f'{one_data} does not have the same size in both '
+                      'TimeSeries')
+                return False
 
         if self.time_info != ts.time_info:
             print('time_info is not equal')
@@ -477,6 +889,61 @@ class TimeSeries():
 
         return True
 
+    def digest(self) -> str:
+        """
+        Calculate a digest of the TimeSeries contents.
+
+        The digest is a blake2b hash of the time, the data, the events, the
+        time_info and the data_info. Two TimeSeries with the same digest have
+        identical contents, bit for bit. This is useful to find duplicate
+        TimeSeries or to index them in a dict, without comparing them one by
+        one.
+
+        The data keys are hashed in sorted order, so that two TimeSeries that
+        only differ in the order of their data keys have the same digest.
+        Since the TimeSeries attributes can be modified at any time, the
+        digest is calculated again at each call; the arrays are hashed
+        directly from their memory buffers.
+
+        Returns
+        -------
+        str
+            The digest, as a string of 40 hexadecimal characters.
+
+        Example
+        -------
+        >>> ts1 = ktk.TimeSeries(time=np.arange(10))
+        >>> ts2 = ts1.copy()
+        >>> ts1.digest() == ts2.digest()
+        True
+
+        >>> ts2.add_event(1.0)
+        >>> ts1.digest() == ts2.digest()
+        False
+
+        """
+        def update_with_array(hasher, array):
+            array = np.asarray(array)
+            hasher.update(f'{array.dtype.str}{array.shape}'.encode())
+            if array.dtype.hasobject:
+                hasher.update(repr(array.tolist()).encode())
+            else:
+                hasher.update(np.ascontiguousarray(array).data)
+
+        def canonical(value):
+            return json.dumps(value, sort_keys=True, default=repr).encode()
+
+        hasher = hashlib.blake2b(digest_size=20)
+        update_with_array(hasher, self.time)
+        for key in sorted(self.data):
+            hasher.update(canonical(key))
+            update_with_array(hasher, self.data[key])
+        hasher.update(canonical(
+            [[event.time, event.name] for event in self.events]))
+        hasher.update(canonical(self.time_info))
+        hasher.update(canonical(self.data_info))
+        return hasher.hexdigest()
+
     def to_dataframe(self) -> pd.DataFrame:
         """
         Create a DataFrame by reshaping all data to one bidimensional table.
@@ -706,6 +1173,40 @@ class TimeSeries():
         """
         self.events.append(TimeSeriesEvent(time, name))
 
+    def add_events(self, times: Union[Sequence[float], np.ndarray],
+                   names: Union[str, Sequence[str]] = 'event') -> None:
+        """
+        Add many events to the TimeSeries at once.
+
+        Parameters
+        ----------
+        times
+            The times of the events, in the same unit as `time_info['Unit']`.
+        names
+            Optional. The name of every event, or a list with the name of each
+            event.
+
+        Example
+        -------
+            >>> ts = ktk.TimeSeries()
+            >>> ts.add_events([5.5, 10.8], 'push')
+            >>> ts.add_events([2.3, 3.1], ['start', 'stop'])
+
+            >>> ts.events
+            [TimeSeriesEvent(time=5.5, name='push'),
+             TimeSeriesEvent(time=10.8, name='push'),
+             TimeSeriesEvent(time=2.3, name='start'),
+             TimeSeriesEvent(time=3.1, name='stop')]
+
+        """
+        times = np.asarray(times).tolist()
+        if isinstance(names, str):
+            names = [names] * len(times)
+        if len(names) != len(times):
+            raise ValueError('times and names must have the same length.')
+        self.events.extend(
+            [TimeSeriesEvent(time, name) for time, name in zip(times, names)])
+
     def rename_event(self,
                      old_name: str,
                      new_name: str,
@@ -753,11 +1254,10 @@ class TimeSeries():
             return  # Nothing to do.
 
         if occurrence is None:
-            # Rename every occurrence of this event
-            index = self.get_event_index(old_name, 0)
-            while ~np.isnan(index):
-                self.events[index].name = new_name  # type: ignore
-                index = self.get_event_index(old_name, 0)
+            # Rename every occurrence of this event, except those with a nan
+            # time as get_event_index.
+            for index in self._get_event_indexes(old_name):
+                self.events[index].name = new_name
 
         else:
             index = self.get_event_index(old_name, occurrence)
@@ -805,11 +1305,10 @@ class TimeSeries():
         [TimeSeriesEvent(time=2.3, name='event2')]
 
         """
-        if occurrence is None:  # Remove all occurrences
-            event_index = self.get_event_index(name, 0)
-            while ~np.isnan(event_index):
-                self.events.pop(event_index)  # type: ignore
-                event_index = self.get_event_index(name, 0)
+        if occurrence is None:  # Remove all occurrences, except nan times
+            to_remove = set(self._get_event_indexes(name).tolist())
+            self.events = [event for (i, event) in enumerate(self.events)
+                           if i not in to_remove]
 
         else:  # Remove only the specified occurrence
             event_index = self.get_event_index(name, occurrence)
@@ -1052,8 +1551,116 @@ class TimeSeries():
                     self.events.pop(i)
 
     def copy(self) -> 'TimeSeries':
-        """Deep copy of a TimeSeries."""
-        return deepcopy(self)
+        """
+        Deep copy of a TimeSeries.
+
+        If kineticstoolkit.config.copy_on_write is True, the data arrays are
+        not duplicated immediately: they are shared by both TimeSeries, and
+        each TimeSeries gets its own copy of a data array only when it first
+        accesses it (e.g., ts.data['Forces']). If the other TimeSeries has
+        already gotten its own copy, the shared array is given back without
+        being copied. Since the shared arrays are read-only, any reference to
+        a data array obtained before the copy can no longer be used to modify
+        it. Data arrays that are views of writeable arrays, the time, events,
+        time_info and data_info are always deep-copied.
+
+        The number of bytes shared and duplicated by this method and by the
+        later accesses to shared arrays is reported by
+        ktk.timeseries.get_copy_statistics().
+
+        """
+        if not kineticstoolkit.config.copy_on_write:
+            if isinstance(self.data, _CopyOnWriteDict):
+                arrays = [self.data._peek(key) for key in self.data]
+            else:
+                arrays = [self.data[key] for key in self.data]
+            _copy_statistics['duplicated'] += (
+                _nbytes(self.time) + sum([_nbytes(array)
+                                          for array in arrays]))
+            ts = deepcopy(self)
+            self._copy_time_analysis(ts)
+            return ts
+
+        if type(self.data) is dict:
+            self.data = _CopyOnWriteDict(self.data)
+
+        ts = TimeSeries()
+        ts.time = deepcopy(self.time)
+        _copy_statistics['duplicated'] += _nbytes(ts.time)
+        if isinstance(self.data, _CopyOnWriteDict):
+            ts.data = _CopyOnWriteDict(
+                {key: self.data._share(key) for key in self.data})
+        else:  # e.g., the lazy data of a TimeSeries loaded with ktk.load
+            ts.data = _CopyOnWriteDict(
+                {key: _share_if_immutable(self.data[key])
+                 for key in self.data})
+        ts.time_info = deepcopy(self.time_info)
+        ts.data_info = deepcopy(self.data_info)
+        ts.events = deepcopy(self.events)
+        self._copy_time_analysis(ts)
+        return ts
+
+    def _copy_time_analysis(self, ts: 'TimeSeries') -> None:
+        """Give the cached analysis of time to the time of a copy."""
+        analysis = _get_cached_time_analysis(self.time)
+        if analysis is not None:
+            _set_time_analysis(ts.time, analysis)
+
+    @property
+    def is_uniform(self) -> bool:
+        """
+        True if the TimeSeries is sampled at a constant sampling rate.
+
+        The time vector must be increasing, without nans, and with a constant
+        sampling interval (with a relative tolerance of 1e-6). The analysis
+        of the time vector is cached, see TimeSeries.get_index_at_time.
+
+        Example
+        -------
+        >>> ts = ktk.TimeSeries(time=np.arange(10) / 100)
+        >>> ts.is_uniform
+        True
+
+        >>> ts.time[5] = 0.051
+        >>> ts.time[-1] = 1.0
+        >>> ts.is_uniform
+        False
+
+        """
+        return _analyze_time(self.time) == 'uniform'
+
+    @property
+    def sampling_rate(self) -> float:
+        """
+        Sampling rate of the TimeSeries in Hz, or nan if it is not uniform.
+
+        See TimeSeries.is_uniform.
+
+        Example
+        -------
+        >>> ts = ktk.TimeSeries(time=np.arange(10) / 100)
+        >>> ts.sampling_rate
+        100.0
+
+        """
+        if not self.is_uniform:
+            return np.nan
+        return float(
+            (self.time.shape[0] - 1) / (self.time[-1] - self.time[0]))
+
+    def _get_writeable_data(self, data_key: str) -> np.ndarray:
+        """
+        Get a data array to modify in place.
+
+        If the array is read-only (e.g., shared by copy-on-write), it is
+        replaced by a writeable copy first.
+        """
+        array = self.data[data_key]
+        if not array.flags.writeable:
+            array = np.array(array)
+            _copy_statistics['duplicated'] += array.nbytes
+            self.data[data_key] = array
+        return array
 
     def plot(self,
              data_keys: Union[str, List[str]] = [],
@@ -1200,19 +1807,48 @@ class TimeSeries():
             axes.legend(loc=legend_location,
                         ncol=1 + int(len(labels) / 40))  # Max 40 items per line
 
-    def get_index_at_time(self, time: float) -> int:
+    def _get_indexes_at_times(self, times: np.ndarray, function: Callable,
+                              vectorized_function: Callable,
+                              **kwargs) -> np.ndarray:
+        """
+        Apply an index lookup function to an array of times.
+
+        The lookup is vectorized for monotonic time and finite times, and is
+        done time by time using function otherwise.
+        """
+        times = np.asarray(times, dtype=float)
+        if _analyze_time(self.time) != 'unsorted':
+            is_vectorized = np.isfinite(times)
+        else:
+            is_vectorized = np.zeros(times.shape, dtype=bool)
+
+        indexes = np.empty(times.shape)
+        indexes[is_vectorized] = vectorized_function(
+            self.time, times[is_vectorized], **kwargs)
+        for i_time in np.nonzero(~is_vectorized.ravel())[0]:
+            indexes.flat[i_time] = function(times.flat[i_time], **kwargs)
+
+        if np.any(np.isnan(indexes)):
+            return indexes
+        else:
+            return indexes.astype(int)
+
+    def get_index_at_time(self, time: Union[float, np.ndarray]
+                          ) -> Union[int, np.ndarray]:
         """
         Get the time index that is the closest to the specified time.
 
         Parameters
         ----------
         time
-            Time to look for in the TimeSeries' time vector.
+            Time to look for in the TimeSeries' time vector. Can also be an
+            array of times.
 
         Returns
         -------
-        int
-            The index in the time vector.
+        int | np.ndarray
+            The index in the time vector, or an array of indexes if time is
+            an array.
 
         Example
         -------
@@ -1227,26 +1863,60 @@ class TimeSeries():
         >>> ts.get_index_at_time(1.1)
         2
 
-        """
-        return int(np.argmin(np.abs(self.time - float(time))))
+        >>> ts.get_index_at_time([0.1, 0.9, 5])
+        array([0, 2, 4])
 
-    def get_index_before_time(self, time: float, *,
-                              inclusive: bool = False) -> Union[int, float]:
+        Note
+        ----
+        When the TimeSeries' time is monotonic, the index is found in
+        O(log n), or in O(1) for a constant sampling rate. Otherwise, the
+        whole time vector is scanned. The analysis of the time vector is
+        cached, and is updated when time is replaced or when its length or
+        one of a subset of evenly spaced samples (including the first and
+        last ones) is modified in place.
+
+        """
+        if np.ndim(time) > 0:
+            return self._get_indexes_at_times(
+                time, self.get_index_at_time, _indexes_at_times)
+
+        time = float(time)
+        analysis = _analyze_time(self.time)
+        if analysis == 'unsorted' or not math.isfinite(time):
+            return int(np.argmin(np.abs(self.time - time)))
+
+        index = _searchsorted(self.time, time, 'left', analysis)
+        if index == 0:
+            return 0
+        if (index == self.time.shape[0] or
+                abs(self.time[index - 1] - time) <=
+                abs(self.time[index] - time)):
+            # First occurrence of the lower sample, as np.argmin
+            return _searchsorted(self.time, self.time[index - 1], 'left',
+                                 analysis)
+        return index
+
+    def get_index_before_time(self, time: Union[float, np.ndarray], *,
+                              inclusive: bool = False
+                              ) -> Union[int, float, np.ndarray]:
         """
         Get the time index that is just before the specified time.
 
         Parameters
         ----------
         time
-            Time to look for in the TimeSeries' time vector.
+            Time to look for in the TimeSeries' time vector. Can also be an
+            array of times.
         inclusive
             Optional. True to include the given time in the comparison.
 
         Returns
         -------
-        int
+        int | float | np.ndarray
             The index in the time vector. If no value is before the specified
-            time, a value of np.nan is returned.
+            time, a value of np.nan is returned. If time is an array, an
+            array of indexes is returned, which is a float array if it
+            contains nans.
 
         Example
         -------
@@ -1270,7 +1940,21 @@ class TimeSeries():
         >>> ts.get_index_before_time(0, inclusive=True)
         0
 
+        >>> ts.get_index_before_time([0, 0.9, 1.1])
+        array([nan,  1.,  2.])
+
+        Note
+        ----
+        When the TimeSeries' time is monotonic, the index is found in
+        O(log n), or in O(1) for a constant sampling rate. Otherwise, the
+        whole time vector is scanned.
+
         """
+        if np.ndim(time) > 0:
+            return self._get_indexes_at_times(
+                time, self.get_index_before_time, _indexes_before_times,
+                inclusive=inclusive)
+
         # Edge case
         try:
             if inclusive and time == self.time[0]:
@@ -1278,14 +1962,24 @@ class TimeSeries():
         except IndexError:  # If time was empty
             return np.nan
 
-        # Other cases
-        diff = float(time) - self.time
-        diff[diff <= 0] = np.nan
+        analysis = _analyze_time(self.time)
+        if analysis != 'unsorted' and math.isfinite(time):
+            index = _searchsorted(self.time, float(time), 'left',
+                                  analysis) - 1
+            if index < 0:
+                return np.nan
+            # First occurrence of this sample, as np.nanargmin
+            index = _searchsorted(self.time, self.time[index], 'left',
+                                  analysis)
 
-        if np.all(np.isnan(diff)):  # All nans
-            return np.nan
+        else:
+            diff = float(time) - self.time
+            diff[diff <= 0] = np.nan
+
+            if np.all(np.isnan(diff)):  # All nans
+                return np.nan
 
-        index = np.nanargmin(diff)
+            index = np.nanargmin(diff)
 
         if inclusive and self.time[index] < time:
             index += 1
@@ -1295,23 +1989,27 @@ class TimeSeries():
         else:
             return np.nan
 
-    def get_index_after_time(self, time: float, *,
-                             inclusive: bool = False) -> Union[int, float]:
+    def get_index_after_time(self, time: Union[float, np.ndarray], *,
+                             inclusive: bool = False
+                             ) -> Union[int, float, np.ndarray]:
         """
         Get the time index that is just after the specified time.
 
         Parameters
         ----------
         time
-            Time to look for in the TimeSeries' time vector.
+            Time to look for in the TimeSeries' time vector. Can also be an
+            array of times.
         inclusive
             Optional. True to include the given time in the comparison.
 
         Returns
         -------
-        int
+        int | float | np.ndarray
             The index in the time vector. If no value is after the
-            specified time, a value of np.nan is returned.
+            specified time, a value of np.nan is returned. If time is an
+            array, an array of indexes is returned, which is a float array
+            if it contains nans.
 
         Example
         -------
@@ -1335,7 +2033,21 @@ class TimeSeries():
         >>> ts.get_index_after_time(2, inclusive=True)
         4
 
+        >>> ts.get_index_after_time([0.9, 1])
+        array([2, 3])
+
+        Note
+        ----
+        When the TimeSeries' time is monotonic, the index is found in
+        O(log n), or in O(1) for a constant sampling rate. Otherwise, the
+        whole time vector is scanned.
+
         """
+        if np.ndim(time) > 0:
+            return self._get_indexes_at_times(
+                time, self.get_index_after_time, _indexes_after_times,
+                inclusive=inclusive)
+
         # Edge case
         try:
             if inclusive and time == self.time[-1]:
@@ -1343,14 +2055,20 @@ class TimeSeries():
         except IndexError:  # If time was empty
             return np.nan
 
-        # Other cases
-        diff = self.time - float(time)
-        diff[diff <= 0] = np.nan
+        analysis = _analyze_time(self.time)
+        if analysis != 'unsorted' and math.isfinite(time):
+            index = _searchsorted(self.time, float(time), 'right', analysis)
+            if index == self.time.shape[0]:
+                return np.nan
 
-        if np.all(np.isnan(diff)):  # All nans
-            return np.nan
+        else:
+            diff = self.time - float(time)
+            diff[diff <= 0] = np.nan
+
+            if np.all(np.isnan(diff)):  # All nans
+                return np.nan
 
-        index = np.nanargmin(diff)
+            index = np.nanargmin(diff)
 
         if inclusive and self.time[index] > time:
             index -= 1
@@ -1385,25 +2103,54 @@ class TimeSeries():
         if occurrence < 0:
             raise ValueError('occurrence must be positive')
 
-        # Make a list of event times, with NaNs for events whose name doesn't
-        # match what we're looking for.
-        event_times = (
-            [event.time if event.name == name else np.nan
-             for event in self.events])
+        event_indexes = self._get_event_indexes(name)
+        if occurrence < event_indexes.shape[0]:
+            return int(event_indexes[occurrence])
+        else:
+            return np.nan
+
+    def _get_event_indexes(self, name: str) -> np.ndarray:
+        """
+        Get the indexes of every occurrence of an event name.
 
-        # Sort in time
-        event_indexes = np.argsort(event_times)
+        Returns the indexes of the events that have this name, sorted in
+        time, in a single pass over the events list. Events with a nan time
+        are excluded.
+        """
+        indexes = np.array([i for (i, event) in enumerate(self.events)
+                            if event.name == name], dtype=int)
+        times = np.array([self.events[i].time for i in indexes], dtype=float)
+        is_valid = ~np.isnan(times)
+        order = np.argsort(times[is_valid], kind='stable')
+        return indexes[is_valid][order]
 
-        # Remove indexes that correspond to nan time (wrong events)
-        clean_event_indexes = (
-            [index if ~np.isnan(event_times[index]) else np.nan
-             for index in event_indexes])
+    def get_event_times(self, name: str) -> np.ndarray:
+        """
+        Get the times of every occurrence of an event name.
 
-        # Get the event occurrence
-        try:
-            return clean_event_indexes[occurrence]
-        except IndexError:
-            return np.nan
+        Parameters
+        ----------
+        name
+            Name of the event to look for in the events list.
+
+        Returns
+        -------
+        np.ndarray
+            The times of the events, sorted in time. An empty array is
+            returned if no event has this name.
+
+        Example
+        -------
+        >>> ts = ktk.TimeSeries()
+        >>> ts.add_events([10.8, 5.5, 2.3], ['push', 'recovery', 'push'])
+
+        >>> ts.get_event_times('push')
+        array([ 2.3, 10.8])
+
+        """
+        return np.array([self.events[i].time
+                         for i in self._get_event_indexes(name)],
+                        dtype=float)
 
     def get_event_time(self, name: str,
                        occurrence: int = 0) -> float:
@@ -1448,7 +2195,41 @@ class TimeSeries():
         else:
             return np.nan
 
-    def get_ts_at_time(self, time: float) -> 'TimeSeries':
+    def _get_ts_at_indexes(self, index: Union[int, range],
+                           copy: bool) -> 'TimeSeries':
+        """
+        Get a subset of the TimeSeries at an index or a range of indexes.
+
+        If copy is False, the arrays of the subset are views of the
+        TimeSeries' arrays whenever possible: a range of valid indexes is
+        applied as a slice. The events and info are always copied, so that
+        modifying them in the subset does not modify the TimeSeries.
+        """
+        if (isinstance(index, range) and index.step == 1 and
+                0 <= index.start and 0 <= index.stop <= self.time.shape[0]):
+            index = slice(index.start, index.stop)  # type: ignore
+
+        out_ts = TimeSeries()
+        out_ts.time = self.time[index]
+        out_ts.data = {key: self.data[key][index] for key in self.data}
+
+        if copy:
+            out_ts.time = out_ts.time.copy()
+            for key in out_ts.data:
+                out_ts.data[key] = out_ts.data[key].copy()
+            out_ts.time_info = deepcopy(self.time_info)
+            out_ts.data_info = deepcopy(self.data_info)
+        else:
+            out_ts.time_info = self.time_info.copy()
+            out_ts.data_info = {key: self.data_info[key].copy()
+                                for key in self.data_info}
+
+        out_ts.events = [TimeSeriesEvent(event.time, event.name)
+                         for event in self.events]
+        return out_ts
+
+    def get_ts_at_time(self, time: float, *,
+                       copy: bool = True) -> 'TimeSeries':
         """
         Get a one-data subset of the TimeSeries at the nearest time.
 
@@ -1456,6 +2237,10 @@ class TimeSeries():
         ----------
         time
             Time to look for in the TimeSeries' time vector.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Returns
         -------
@@ -1479,15 +2264,11 @@ class TimeSeries():
         2
 
         """
-        out_ts = self.copy()
-        index = self.get_index_at_time(time)
-        out_ts.time = out_ts.time[index]
-        for the_data in out_ts.data.keys():
-            out_ts.data[the_data] = out_ts.data[the_data][index]
-        return out_ts
+        return self._get_ts_at_indexes(self.get_index_at_time(time), copy)
 
     def get_ts_at_event(self, name: str,
-                        occurrence: int = 0) -> 'TimeSeries':
+                        occurrence: int = 0, *,
+                        copy: bool = True) -> 'TimeSeries':
         """
         Get a one-data subset of the TimeSeries at the event's nearest time.
 
@@ -1498,6 +2279,10 @@ class TimeSeries():
         occurrence
             Optional. i_th occurence of the event to look for in the events
             list, starting at 0.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Returns
         -------
@@ -1506,10 +2291,11 @@ class TimeSeries():
 
         """
         time = self.get_event_time(name, occurrence)
-        return self.get_ts_at_time(time)
+        return self.get_ts_at_time(time, copy=copy)
 
     def get_ts_before_index(self, index: int, *,
-                            inclusive: bool = False) -> 'TimeSeries':
+                            inclusive: bool = False,
+                            copy: bool = True) -> 'TimeSeries':
         """
         Get a subset of the TimeSeries before the specified time index.
 
@@ -1519,6 +2305,10 @@ class TimeSeries():
             Time index
         inclusive
             Optional. True to include the given time index.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Example
         -------
@@ -1533,8 +2323,6 @@ class TimeSeries():
         array([0. , 0.1, 0.2])
 
         """
-        out_ts = self.copy()
-
         if index < 0:
             index += len(self.time)
 
@@ -1546,13 +2334,11 @@ class TimeSeries():
             else:
                 index_range = range(index)
 
-        out_ts.time = out_ts.time[index_range]
-        for the_data in out_ts.data.keys():
-            out_ts.data[the_data] = out_ts.data[the_data][index_range]
-        return out_ts
+        return self._get_ts_at_indexes(index_range, copy)
 
     def get_ts_after_index(self, index: int, *,
-                           inclusive: bool = False) -> 'TimeSeries':
+                           inclusive: bool = False,
+                           copy: bool = True) -> 'TimeSeries':
         """
         Get a subset of the TimeSeries after the specified time index.
 
@@ -1562,6 +2348,10 @@ class TimeSeries():
             Time index
         inclusive
             Optional. True to include the given time index.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Example
         -------
@@ -1576,8 +2366,6 @@ class TimeSeries():
         array([0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
 
         """
-        out_ts = self.copy()
-
         if index < 0:
             index += len(self.time)
 
@@ -1586,13 +2374,11 @@ class TimeSeries():
         else:
             index_range = range(index + 1, len(self.time))
 
-        out_ts.time = out_ts.time[index_range]
-        for the_data in out_ts.data.keys():
-            out_ts.data[the_data] = out_ts.data[the_data][index_range]
-        return out_ts
+        return self._get_ts_at_indexes(index_range, copy)
 
     def get_ts_between_indexes(self, index1: int, index2: int, *,
-                               inclusive: bool = False) -> 'TimeSeries':
+                               inclusive: bool = False,
+                               copy: bool = True) -> 'TimeSeries':
         """
         Get a subset of the TimeSeries before two specified time indexes.
 
@@ -1602,6 +2388,13 @@ class TimeSeries():
             Time indexes
         inclusive
             Optional. True to include the given time indexes.
+        copy
+            Optional. False to return a TimeSeries whose time and data are
+            views of this TimeSeries' time and data, instead of copies.
+            Extracting a short window of a long TimeSeries then allocates no
+            memory for the arrays, but modifying the values of these arrays
+            also modifies this TimeSeries. The events, time_info and data_info
+            are always copied. Default is True.
 
         Example
         -------
@@ -1616,7 +2409,6 @@ class TimeSeries():
         array([0.2, 0.3, 0.4, 0.5])
 
         """
-        out_ts = self.copy()
         if np.isnan(index1) or np.isnan(index2):
             index_range = range(0)
         else:
@@ -1625,13 +2417,11 @@ class TimeSeries():
             else:
                 index_range = range(index1 + 1, index2)
 
-        out_ts.time = out_ts.time[index_range]
-        for the_data in out_ts.data.keys():
-            out_ts.data[the_data] = out_ts.data[the_data][index_range]
-        return out_ts
+        return self._get_ts_at_indexes(index_range, copy)
 
     def get_ts_before_time(self, time: float, *,
-                           inclusive: bool = False) -> 'TimeSeries':
+                           inclusive: bool = False,
+                           copy: bool = True) -> 'TimeSeries':
         """
         Get a subset of the TimeSeries before the specified time.
 
@@ -1641,6 +2431,10 @@ class TimeSeries():
             Time to look for in the TimeSeries' time vector.
         inclusive
             Optional. True to include the given time in the comparison.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Example
         -------
@@ -1657,17 +2451,19 @@ class TimeSeries():
         """
         # Edge case
         if len(self.time) == 0 or time > self.time[-1]:
-            return self.copy()
+            return self._get_ts_at_indexes(range(len(self.time)), copy)
 
         # Other cases
         index = self.get_index_before_time(time, inclusive=inclusive)
         if ~np.isnan(index):
-            return self.get_ts_before_index(index, inclusive=True)  # type: ignore # noqa
+            return self.get_ts_before_index(
+                index, inclusive=True, copy=copy)  # type: ignore
         else:
-            return self.get_ts_before_index(0, inclusive=False)
+            return self.get_ts_before_index(0, inclusive=False, copy=copy)
 
     def get_ts_after_time(self, time: float, *,
-                          inclusive: bool = False) -> 'TimeSeries':
+                          inclusive: bool = False,
+                          copy: bool = True) -> 'TimeSeries':
         """
         Get a subset of the TimeSeries after the specified time.
 
@@ -1677,6 +2473,10 @@ class TimeSeries():
             Time to look for in the TimeSeries' time vector.
         inclusive
             Optional. True to include the given time in the comparison.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Example
         -------
@@ -1695,17 +2495,19 @@ class TimeSeries():
         """
         # Edge case
         if len(self.time) == 0 or time < self.time[0]:
-            return self.copy()
+            return self._get_ts_at_indexes(range(len(self.time)), copy)
 
         # Other cases
         index = self.get_index_after_time(time, inclusive=inclusive)
         if ~np.isnan(index):
-            return self.get_ts_after_index(index, inclusive=True)  # type: ignore # noqa
+            return self.get_ts_after_index(
+                index, inclusive=True, copy=copy)  # type: ignore
         else:
-            return self.get_ts_after_index(-1, inclusive=False)
+            return self.get_ts_after_index(-1, inclusive=False, copy=copy)
 
     def get_ts_between_times(self, time1: float, time2: float, *,
-                             inclusive: bool = False) -> 'TimeSeries':
+                             inclusive: bool = False,
+                             copy: bool = True) -> 'TimeSeries':
         """
         Get a subset of the TimeSeries between two specified times.
 
@@ -1715,6 +2517,10 @@ class TimeSeries():
             Times to look for in the TimeSeries' time vector.
         inclusive
             Optional. True to include the given time in the comparison.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Example
         -------
@@ -1731,14 +2537,15 @@ class TimeSeries():
         """
         sorted_times = np.sort([time1, time2])
         new_ts = self.get_ts_after_time(sorted_times[0],
-                                        inclusive=inclusive)
+                                        inclusive=inclusive, copy=False)
         new_ts = new_ts.get_ts_before_time(sorted_times[1],
-                                           inclusive=inclusive)
+                                           inclusive=inclusive, copy=copy)
         return new_ts
 
     def get_ts_before_event(self, name: str,
                             occurrence: int = 0, *,
-                            inclusive: bool = False) -> 'TimeSeries':
+                            inclusive: bool = False,
+                            copy: bool = True) -> 'TimeSeries':
         """
         Get a subset of the TimeSeries before the specified event.
 
@@ -1751,6 +2558,10 @@ class TimeSeries():
             list, starting at 0.
         inclusive
             Optional. True to include the given time in the comparison.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Example
         -------
@@ -1774,11 +2585,12 @@ class TimeSeries():
 
         """
         time = self.get_event_time(name, occurrence)
-        return self.get_ts_before_time(time, inclusive=inclusive)
+        return self.get_ts_before_time(time, inclusive=inclusive, copy=copy)
 
     def get_ts_after_event(self, name: str,
                            occurrence: int = 0, *,
-                           inclusive: bool = False) -> 'TimeSeries':
+                           inclusive: bool = False,
+                           copy: bool = True) -> 'TimeSeries':
         """
         Get a subset of the TimeSeries after the specified event.
 
@@ -1791,6 +2603,10 @@ class TimeSeries():
             list, starting at 0.
         inclusive
             Optional. True to include the given event in the comparison.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Example
         -------
@@ -1814,12 +2630,13 @@ class TimeSeries():
 
         """
         time = self.get_event_time(name, occurrence)
-        return self.get_ts_after_time(time, inclusive=inclusive)
+        return self.get_ts_after_time(time, inclusive=inclusive, copy=copy)
 
     def get_ts_between_events(self, name1: str, name2: str,
                               occurrence1: int = 0,
                               occurrence2: int = 0,
-                              *, inclusive: bool = False) -> 'TimeSeries':
+                              *, inclusive: bool = False,
+                              copy: bool = True) -> 'TimeSeries':
         """
         Get a subset of the TimeSeries between two specified events.
 
@@ -1832,6 +2649,10 @@ class TimeSeries():
             list, starting at 0.
         inclusive
             Optional. True to include the given time in the comparison.
+        copy
+            Optional. False to return a TimeSeries whose data are views of
+            this TimeSeries' data instead of copies. See
+            get_ts_between_indexes.
 
         Example
         -------
@@ -1850,9 +2671,9 @@ class TimeSeries():
 
         """
         ts = self.get_ts_after_event(name1, occurrence1,
-                                     inclusive=inclusive)
+                                     inclusive=inclusive, copy=False)
         ts = ts.get_ts_before_event(name2, occurrence2,
-                                    inclusive=inclusive)
+                                    inclusive=inclusive, copy=copy)
         return ts
 
     def ui_get_ts_between_clicks(
@@ -1899,11 +2720,62 @@ class TimeSeries():
             values represent missing samples (samples that contain at least
             one nan value).
         """
-        values = self.data[data_key].copy()
-        # Reduce the dimension of values while keeping the time dimension.
-        while len(values.shape) > 1:
-            values = np.sum(values, 1)  # type: ignore
-        return np.isnan(values)
+        return _get_gap_index(self.data[data_key])[0]
+
+    @unstable
+    def gap_report(self) -> pd.DataFrame:
+        """
+        Summarize the missing samples of each data key.
+
+        A sample is missing if it contains at least one nan value. A gap is a
+        run of consecutive missing samples.
+
+        Returns
+        -------
+        pd.DataFrame
+            A DataFrame with one row per data key, and with the columns:
+
+            - 'Missing samples': the total number of missing samples;
+            - 'Gaps': the number of gaps;
+            - 'Longest gap': the number of samples of the longest gap;
+            - 'Longest gap start': the time of the first sample of the
+              longest gap, or nan if there is no gap;
+            - 'Longest gap end': the time of the last sample of the
+              longest gap, or nan if there is no gap.
+
+        Example
+        -------
+        >>> ts = ktk.TimeSeries(time=np.arange(10.0))
+        >>> ts.data['signal1'] = np.arange(10.0)
+        >>> ts.data['signal1'][[2, 5, 6, 7]] = np.nan
+        >>> ts.data['signal2'] = np.zeros((10, 4))
+        >>> report = ts.gap_report()
+        >>> report[['Missing samples', 'Gaps', 'Longest gap']]
+                 Missing samples  Gaps  Longest gap
+        signal1                4     2            3
+        signal2                0     0            0
+
+        >>> report[['Longest gap start', 'Longest gap end']]
+                 Longest gap start  Longest gap end
+        signal1                5.0              7.0
+        signal2                NaN              NaN
+
+        """
+        columns = ['Missing samples', 'Gaps', 'Longest gap',
+                   'Longest gap start', 'Longest gap end']
+        rows = []
+        for key in self.data:
+            (is_missing, starts, lengths) = _get_gap_index(self.data[key])
+            if lengths.shape[0] > 0:
+                longest = np.argmax(lengths)
+                rows.append([
+                    int(np.sum(lengths)), lengths.shape[0],
+                    int(lengths[longest]),
+                    self.time[starts[longest]],
+                    self.time[starts[longest] + lengths[longest] - 1]])
+            else:
+                rows.append([0, 0, 0, np.nan, np.nan])
+        return pd.DataFrame(rows, index=list(self.data), columns=columns)
 
     def fill_missing_samples(self, max_missing_samples: int, *,
                              method: str = 'linear') -> None:
@@ -1921,7 +2793,9 @@ class TimeSeries():
         ----------
         max_missing_samples
             Maximal number of consecutive missing samples to fill. Set to
-            zero to fill all missing samples.
+            zero to fill all missing samples. The samples of longer holes
+            are set to nan entirely, even if some of their components were
+            not missing.
         method
             Optional. The interpolation method. This input may take any value
             supported by scipy.interpolate.interp1d, such as 'linear',
@@ -1930,30 +2804,108 @@ class TimeSeries():
 
         """
         max_missing_samples = int(max_missing_samples)
+        n_samples = self.time.shape[0]
+
+        # Group the data keys that have the same missing samples, so that
+        # they are interpolated together.
+        groups = {}  # type: Dict[bytes, List[str]]
+        gap_indexes = {}
+        for key in self.data:
+            gap_index = _get_gap_index(self.data[key])
+            if gap_index[1].shape[0] == 0:
+                continue  # Nothing to fill
+            mask_key = np.packbits(gap_index[0]).tobytes()
+            if mask_key not in groups:
+                groups[mask_key] = []
+                gap_indexes[mask_key] = gap_index
+            groups[mask_key].append(key)
+
+        for mask_key, keys in groups.items():
+
+            (is_missing, starts, lengths) = gap_indexes[mask_key]
+            visible_indexes = np.nonzero(~is_missing)[0]
+            n_visible = visible_indexes.shape[0]
+
+            if n_visible < 3:  # Only Nans, cannot interpolate.
+                for key in keys:
+                    warnings.warn(
+                        f'Warning: Almost only NaNs found in signal "{key}.')
+                    self.data[key] = np.full(self.data[key].shape, np.nan)
+                continue
 
-        for data in self.data:
+            # Find the samples to fill, in holes no longer than
+            # max_missing_samples
+            if max_missing_samples > 0:
+                to_fill = lengths <= max_missing_samples
+                edges = np.zeros(n_samples + 1, dtype=int)
+                edges[starts[to_fill]] = 1
+                edges[starts[to_fill] + lengths[to_fill]] = -1
+                is_filled = np.cumsum(edges[:-1]) > 0
+                fill_indexes = np.nonzero(is_filled)[0]
+
+                # The samples of longer holes are set to nan entirely.
+                unfilled_indexes = np.nonzero(is_missing & ~is_filled)[0]
+                if unfilled_indexes.shape[0] > 0:
+                    for key in keys:
+                        values = np.array(self.data[key])
+                        values[unfilled_indexes] = np.nan
+                        self.data[key] = values
+            else:
+                fill_indexes = np.nonzero(is_missing)[0]
 
-            # Fill missing samples
-            is_visible = ~self.isnan(data)
-            ts = self.get_subset(data)
-            ts.data[data] = ts.data[data][is_visible]
-            ts.time = ts.time[is_visible]
-            ts.resample(self.time, method, fill_value='extrapolate')
+            if fill_indexes.shape[0] == 0:
+                continue
 
-            # Put back missing samples in holes longer than max_missing_samples
-            if max_missing_samples > 0:
-                hole_start_index = 0
-                to_keep = np.ones(self.time.shape)
-                for current_index in range(ts.time.shape[0]):
-                    if is_visible[current_index]:
-                        hole_start_index = current_index
-                    elif (current_index - hole_start_index >
-                          max_missing_samples):
-                        to_keep[hole_start_index + 1:current_index + 1] = 0
+            visible_time = self.time[visible_indexes]
+
+            if method == 'linear' and np.all(np.diff(visible_time) > 0):
+                # Fast path: interpolate between (or extrapolate from) the
+                # nearest visible samples, for every key and column at once.
+                position = np.searchsorted(visible_indexes, fill_indexes)
+                position = np.clip(position - 1, 0, n_visible - 2)
+                lower = visible_indexes[position]
+                upper = visible_indexes[position + 1]
+                time_ratio = (
+                    (self.time[fill_indexes] - self.time[lower]) /
+                    (self.time[upper] - self.time[lower]))
+
+                for key in keys:
+                    values = np.array(self.data[key])
+                    lower_values = values[lower]
+                    ratio = time_ratio.reshape(
+                        [-1] + [1] * (values.ndim - 1))
+                    values[fill_indexes] = (
+                        ratio * (values[upper] - lower_values) +
+                        lower_values)
+                    self.data[key] = values
 
-                ts.data[data][to_keep == 0] = np.nan
+            else:
+                # Interpolate all the keys of this group in one call.
+                shapes = [self.data[key].shape for key in keys]
+                visible_values = np.concatenate(
+                    [self.data[key][visible_indexes].reshape(n_visible, -1)
+                     for key in keys], axis=1)
 
-            self.data[data] = ts.data[data]
+                if method == 'pchip':
+                    P = sp.interpolate.PchipInterpolator(
+                        visible_time, visible_values, axis=0,
+                        extrapolate=True)
+                    filled_values = P(self.time[fill_indexes])
+                else:
+                    f = sp.interpolate.interp1d(
+                        visible_time, visible_values, axis=0,
+                        fill_value='extrapolate', kind=method)
+                    filled_values = f(self.time[fill_indexes])
+
+                column = 0
+                for key, shape in zip(keys, shapes):
+                    values = np.array(self.data[key])
+                    n_columns = values[0].size
+                    values[fill_indexes] = filled_values[
+                        :, column:column + n_columns].reshape(
+                            (-1,) + shape[1:])
+                    column += n_columns
+                    self.data[key] = values
 
     def shift(self, time: float) -> None:
         """
@@ -2017,11 +2969,9 @@ class TimeSeries():
             self.events = []
             return
 
-        events = self.events
-        self.events = []
-        for event in events:
-            if event.time >= self.time[0] and event.time <= self.time[-1]:
-                self.add_event(event.time, event.name)
+        self.events = [
+            TimeSeriesEvent(event.time, event.name) for event in self.events
+            if event.time >= self.time[0] and event.time <= self.time[-1]]
 
     def ui_sync(
         self,
@@ -2269,7 +3219,7 @@ class TimeSeries():
             raise ValueError('new_time must not contain nans')
 
         for key in self.data.keys():
-            index = ~self.isnan(key)
+            index = ~_get_gap_index(self.data[key])[0]
 
             if sum(index) < 3:  # Only Nans, cannot interpolate.
                 warnings.warn(
@@ -2285,17 +3235,15 @@ class TimeSeries():
 
                 # Express nans as a range of times to
                 # remove from the final, interpolated timeseries
-                nan_indexes = np.argwhere(~index)
-                time_ranges_to_remove = []  # type: List[Tuple[int, int]]
+                nan_indexes = np.nonzero(~index)[0]
                 length = self.time.shape[0]
-                for i in nan_indexes:
-                    if i > 0 and i < length - 1:
-                        time_range = (self.time[i-1], self.time[i+1])
-                    elif i == 0:
-                        time_range = (-np.inf, self.time[i+1])
-                    else:
-                        time_range = (self.time[i-1], np.inf)
-                    time_ranges_to_remove.append(time_range)
+                lower_times = np.where(
+                    nan_indexes > 0,
+                    self.time[np.maximum(nan_indexes - 1, 0)], -np.inf)
+                upper_times = np.where(
+                    nan_indexes < length - 1,
+                    self.time[np.minimum(nan_indexes + 1, length - 1)],
+                    np.inf)
 
                 if kind == 'pchip':
                     P = sp.interpolate.PchipInterpolator(
@@ -2313,9 +3261,17 @@ class TimeSeries():
                     self.data[key] = f(new_time)
 
                 # Put back nans
-                for j in time_ranges_to_remove:
-                    self.data[key][
-                        (new_time > j[0]) & (new_time < j[1])] = np.nan
+                if _analyze_time(new_time) in ('uniform', 'increasing'):
+                    starts = np.searchsorted(new_time, lower_times, 'right')
+                    stops = np.searchsorted(new_time, upper_times, 'left')
+                    is_nan = np.zeros(new_time.shape[0] + 1, dtype=int)
+                    np.add.at(is_nan, starts, 1)
+                    np.add.at(is_nan, np.maximum(stops, starts), -1)
+                    self.data[key][np.cumsum(is_nan[:-1]) > 0] = np.nan
+                else:
+                    for (lower, upper) in zip(lower_times, upper_times):
+                        self.data[key][
+                            (new_time > lower) & (new_time < upper)] = np.nan
 
         self.time = new_time
 
@@ -154,6 +154,22 @@ def test_detect_cycles():
     assert ts5.events[2].time == 10
     assert len(ts5.events) == 3
 
+    # With hysteresis: the noise between both thresholds is ignored
+    t = np.arange(20)
+    d = np.array([0, 0.6, 0.4, 1.1, 0.9, 0.6, 1.2, 0.4, 0.6, 0.2,
+                  0, 1.5, 0.2, 0.8, 0.1, 0, 0, 0, 0, 0])
+    ts = ktk.TimeSeries(time=t, data={'data': d})
+    ts6 = ktk.cycles.detect_cycles(ts, 'data',
+                                   event_names=['start', 'stop'],
+                                   thresholds=[1, 0.3])
+    assert [(event.time, event.name) for event in ts6.events] == [
+        (3, 'start'), (9, 'stop'), (11, '_'), (11, 'start'), (12, 'stop')]
+
+    # With no cycle at all
+    ts = ktk.TimeSeries(time=t, data={'data': np.zeros(20)})
+    ts7 = ktk.cycles.detect_cycles(ts, 'data', thresholds=[0.5, 0.5])
+    assert ts7.events == []
+
 
 def test_time_normalize():
     # Create a TimeSeries with some events directly synced with the data and
@@ -242,6 +258,37 @@ def test_time_normalize():
     assert np.allclose(ts5.events[8].time, 100 + 325)
 
 
+def test_time_normalize_nans():
+    """Test that nans only spread to the samples around missing data."""
+    ts = ktk.TimeSeries(time=np.arange(21.))
+    ts.data['test'] = np.array([ts.time, ts.time ** 2]).T
+    ts.data['test'][5, 1] = np.nan
+    ts.add_event(0, 'push')
+    ts.add_event(10, 'push')
+    ts.add_event(20, 'push')
+
+    ts2 = ktk.cycles.time_normalize(ts, 'push', 'push', n_points=20)
+    assert ts2.data['test'].shape == (40, 2)
+
+    # Sample 5 (normalized 10) is missing, its neighbours are not.
+    is_nan = np.isnan(ts2.data['test'][:, 0])
+    assert np.all(is_nan == np.isnan(ts2.data['test'][:, 1]))
+    assert np.all(np.nonzero(is_nan)[0] == [9, 10, 11])
+    assert np.allclose(ts2.data['test'][8], [4, 16])
+    assert np.allclose(ts2.data['test'][12], [6, 36])
+    assert np.allclose(ts2.data['test'][20:, 1],
+                       (10 + np.arange(20) / 2) ** 2, atol=0.25)
+
+    # Cycles outside the TimeSeries cannot be normalized.
+    ts.add_event(30, 'push')
+    ts.add_event(40, 'push')
+    try:
+        ktk.cycles.time_normalize(ts, 'push', 'push', n_points=20)
+        raise AssertionError('This should fail.')
+    except ValueError:
+        pass
+
+
 # def test_normalize_extended():
 #     """
 #     Test normalize with extended_span.
@@ -285,6 +332,12 @@ def test_most_repeatable_cycles():
 
     assert test == [1, 4, 0, 2]
 
+    # Same result with multidimensional data
+    test = ktk.cycles.most_repeatable_cycles(
+        np.repeat(data[:, :, np.newaxis], 3, axis=2))
+
+    assert test == [1, 4, 0, 2]
+
 
 def test_stack_unstack():
     # Create a periodic TimeSeries, time-normalize and stack
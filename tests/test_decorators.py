@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright Félix Chénier 2020
+"""
+Unit tests for ktk.decorators.
+"""
+import kineticstoolkit as ktk
+import kineticstoolkit.decorators as decorators
+import numpy as np
+import tempfile
+
+
+def test_cached():
+    """Test the on-disk cache of @cached functions."""
+    calls = []
+
+    @decorators.cached
+    def add(ts, value=1.0):
+        calls.append(value)
+        tsout = ts.copy()
+        tsout.data['signal'] += value
+        return tsout
+
+    ts = ktk.TimeSeries(time=np.arange(10.0))
+    ts.data['signal'] = np.arange(10.0)
+
+    # Disabled by default
+    add(ts)
+    add(ts)
+    assert len(calls) == 2
+    assert add.cache_info()['misses'] == 0
+
+    cache_enabled = ktk.config.cache_enabled
+    cache_folder = ktk.config.cache_folder
+    cache_size = ktk.config.cache_size
+    with tempfile.TemporaryDirectory() as folder:
+        try:
+            ktk.config.cache_enabled = True
+            ktk.config.cache_folder = folder
+
+            calls.clear()
+            a = add(ts)
+            b = add(ts, value=1.0)  # Same arguments, given differently
+            assert calls == [1.0]
+            assert a == b and a is not b
+            assert add.cache_info()['hits'] == 1
+            assert add.cache_info()['misses'] == 1
+            assert add.cache_info()['entries'] == 1
+
+            # Any change in the inputs is a miss
+            ts.add_event(1.0)
+            add(ts)
+            ts.data_info['signal'] = {'Unit': 'm'}
+            add(ts)
+            add(ts, 2.0)
+            assert calls == [1.0, 1.0, 1.0, 2.0]
+            assert add.cache_info()['entries'] == 4
+
+            # Eviction by size, least recently used first
+            add(ts)
+            ktk.config.cache_size = 2 * max(
+                entry.stat().st_size for entry in decorators._cache_entries())
+            add(ts, 3.0)
+            assert add.cache_info()['entries'] == 2
+            add(ts)
+            assert calls == [1.0, 1.0, 1.0, 2.0, 3.0]
+
+            # Invalidation
+            add.cache_clear()
+            assert add.cache_info()['entries'] == 0
+            add(ts)
+            decorators.clear_cache()
+            add(ts)
+            assert calls == [1.0, 1.0, 1.0, 2.0, 3.0, 1.0, 1.0]
+
+            # A change to the function's code is a miss
+            calls.clear()
+
+            @decorators.cached
+            def add(ts, value=1.0):  # Same name, other code
+                calls.append(-value)
+                tsout = ts.copy()
+                tsout.data['signal'] -= value
+                return tsout
+
+            assert np.all(add(ts).data['signal'] == ts.data['signal'] - 1)
+            assert calls == [-1.0]
+
+        finally:
+            ktk.config.cache_enabled = cache_enabled
+            ktk.config.cache_folder = cache_folder
+            ktk.config.cache_size = cache_size
+
+
+def _double(value):
+    return 2 * value
+
+
+def _triple(value):
+    return 3 * value
+
+
+def test_cached_unsupported_arguments():
+    """Test that @cached calls through when it can't identify an argument."""
+    calls = []
+
+    @decorators.cached
+    def apply(func, value):
+        calls.append(value)
+        return func(value)
+
+    def make_scaler(gain):
+        def scale(value):
+            return gain * value
+        return scale
+
+    class Gain:
+        __slots__ = ['gain']
+
+        def __init__(self, gain):
+            self.gain = gain
+
+        def __call__(self, value):
+            return self.gain * value
+
+    cache_enabled = ktk.config.cache_enabled
+    cache_folder = ktk.config.cache_folder
+    with tempfile.TemporaryDirectory() as folder:
+        try:
+            ktk.config.cache_enabled = True
+            ktk.config.cache_folder = folder
+
+            # Closures of the same name with different captured values
+            assert apply(make_scaler(2.0), 1.0) == 2.0
+            assert apply(make_scaler(3.0), 1.0) == 3.0
+
+            # Objects whose state is not in __dict__
+            assert apply(Gain(2.0), 1.0) == 2.0
+            assert apply(Gain(3.0), 1.0) == 3.0
+
+            assert calls == [1.0, 1.0, 1.0, 1.0]
+            assert apply.cache_info()['entries'] == 0
+
+            # Module-level functions are still cached
+            apply(_double, 4.0)
+            apply(_triple, 4.0)
+            apply(_triple, 4.0)
+            assert len(calls) == 6
+        finally:
+            ktk.config.cache_enabled = cache_enabled
+            ktk.config.cache_folder = cache_folder
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__])
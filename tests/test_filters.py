@@ -237,6 +237,33 @@ def test_deriv():
         [-100., 0.]])) < 1E-12)
 
 
+def test_non_uniform_time():
+    """Test the filters on a non-uniform or invalid time vector."""
+    ts = ktk.TimeSeries(time=np.arange(20) / 10)
+    ts.time[10:] += 0.05
+    ts.data['data'] = np.sin(ts.time)
+
+    for function in [
+            lambda ts: ktk.filters.butter(ts, 2),
+            lambda ts: ktk.filters.deriv(ts),
+            lambda ts: ktk.filters.savgol(ts, window_length=5,
+                                          poly_order=2),
+            lambda ts: ktk.filters.smooth(ts, window_length=5)]:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            function(ts)
+        assert any('sampling rate is not constant' in str(warning.message)
+                   for warning in caught)
+
+    # Nans in time
+    ts.time[0] = np.nan
+    try:
+        ktk.filters.butter(ts, 2)
+        raise AssertionError('This should fail.')
+    except ValueError:
+        pass
+
+
 if __name__ == "__main__":
     import pytest
     pytest.main([__file__])
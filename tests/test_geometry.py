@@ -48,6 +48,22 @@ def test_matmul():
 
     assert np.sum(np.abs(result - np.array([3, 4, 5]))) < 1E-15
 
+    # Series of matrices and series of sets of points, with an output buffer
+    T = ktk.geometry.create_transforms('z', np.linspace(0, np.pi, 10),
+                                       translations=[[1, 2, 3]])
+    points = np.random.rand(10, 4, 5)
+    out = np.empty((10, 4, 5))
+    result = ktk.geometry.matmul(T, points, out=out)
+    assert result is out
+    for i in range(10):
+        assert np.allclose(out[i], T[i] @ points[i])
+
+    # Single matrix broadcasted on a series of vectors, with an output buffer
+    out = np.empty((10, 4))
+    ktk.geometry.matmul(T[0:1], points[:, :, 0], out=out)
+    for i in range(10):
+        assert np.allclose(out[i], T[0] @ points[i, :, 0])
+
 
 def test_create_transforms():
     """Test create_transforms."""
@@ -243,6 +259,29 @@ def test_get_angles():
     assert np.allclose(angles, test_angles)
 
 
+def test_register_points():
+    """Test register_points with missing points."""
+    np.random.seed(0)
+
+    # Series of 10 rigid transforms applied on 5 local points
+    T = ktk.geometry.create_transforms(
+        'XYZ', np.random.rand(10, 3) * 2 * np.pi,
+        translations=np.random.rand(10, 3))
+    local_points = np.ones((10, 4, 5))
+    local_points[:, 0:3, :] = np.random.rand(3, 5)
+    global_points = ktk.geometry.matmul(T, local_points)
+
+    # Remove 2 points on sample 1 and 3 points on sample 2
+    global_points[1, :, 0:2] = np.nan
+    local_points[2, :, 2:5] = np.nan
+
+    test = ktk.geometry.register_points(global_points, local_points)
+
+    assert np.allclose(test[[0, 1, 3, 4, 5, 6, 7, 8, 9]],
+                       T[[0, 1, 3, 4, 5, 6, 7, 8, 9]])
+    assert np.all(np.isnan(test[2]))
+
+
 if __name__ == "__main__":
     import pytest
     pytest.main([__file__])
@@ -44,6 +44,18 @@ def test_read_n3d_file():
     assert(markers.time_info['Unit'] == 's')
     assert(markers.data_info['GantD3']['Unit'] == 'm')
 
+    # Read only a subset of markers, memory-mapped
+    subset = ktk.kinematics.read_n3d_file(
+        ktk.config.root_folder +
+        '/data/kinematics/sample_optotrak.n3d', labels=labels,
+        data_keys=['Probe1', 'GantD3'], memory_map=True)
+
+    assert(list(subset.data.keys()) == ['Probe1', 'GantD3'])
+    assert(np.allclose(subset.data['Probe1'], markers.data['Probe1'],
+                       equal_nan=True))
+    assert(np.allclose(subset.data['GantD3'], markers.data['GantD3'],
+                       equal_nan=True))
+
 
 def test_read_c3d_file():
     """Regression test."""
@@ -277,6 +289,40 @@ def test_reconstruction():
     """
 
 
+def test_register_markers_workers():
+    """Test that concurrent registration gives the same result."""
+    np.random.seed(0)
+    markers = ktk.TimeSeries(time=np.arange(100) / 100)
+    rigid_body_configs = {}
+    for i_body in range(4):
+        marker_names = [f'Body{i_body}Marker{i}' for i in range(3)]
+        for marker_name in marker_names:
+            markers.data[marker_name] = np.ones((100, 4))
+            markers.data[marker_name][:, 0:3] = np.random.rand(100, 3)
+        rigid_body_configs[f'Body{i_body}'] = \
+            ktk.kinematics.create_rigid_body_config(markers, marker_names)
+
+    serial = ktk.kinematics.register_markers(markers, rigid_body_configs)
+    concurrent = ktk.kinematics.register_markers(
+        markers, rigid_body_configs, workers=3)
+
+    assert list(serial.data.keys()) == list(concurrent.data.keys())
+    for key in serial.data:
+        assert np.allclose(serial.data[key], concurrent.data[key])
+
+
+def test_write_trc_file(tmp_path):
+    """Test that the TRC header gives the sampling rate."""
+    filename = str(tmp_path / 'markers.trc')
+    markers = ktk.TimeSeries(time=np.arange(50) / 200)
+    markers.data['Marker'] = np.ones((50, 4))
+    ktk.kinematics.write_trc_file(markers, filename)
+    with open(filename) as fid:
+        header = [fid.readline().split('\t') for _ in range(3)]
+    assert float(header[2][0]) == 200.0  # DataRate
+    assert int(header[2][2]) == 50  # NumFrames
+
+
 if __name__ == "__main__":
     import pytest
     pytest.main([__file__])
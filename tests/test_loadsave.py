@@ -7,6 +7,7 @@ Created on Fri Jul 19 14:57:41 2019
 """
 import kineticstoolkit as ktk
 import numpy as np
+import os
 import pandas as pd
 
 
@@ -14,7 +15,7 @@ import pandas as pd
 # This test is implicitly done with test_read_c3d_file in ktk.kinematics
 
 
-def test_save_load():
+def test_save_load(tmp_path):
     """Test the save and load functions."""
     # Create a test variable with all possible supported combinations
     random_variable = np.random.rand(5, 2, 2)
@@ -60,8 +61,9 @@ def test_save_load():
     a['TestDataFrame'] = ts.to_dataframe()
     a['TestSeries'] = a['TestDataFrame']['signal1']
 
-    ktk.save('test.ktk.zip', a)
-    b = ktk.load('test.ktk.zip')
+    filename = str(tmp_path / 'test.ktk.zip')
+    ktk.save(filename, a)
+    b = ktk.load(filename)
     # os.remove('test.mat')
 
     assert a['TestTimeSeries'] == b['TestTimeSeries']
@@ -88,6 +90,291 @@ def test_save_load():
     pd.testing.assert_series_equal(a['TestSeries'], b['TestSeries'])
 
 
+def test_save_load_dtypes(tmp_path):
+    """Test that the arrays' dtype and shape are kept exactly."""
+    filename = str(tmp_path / 'test.ktk.zip')
+    a = {
+        'int32': np.arange(5, dtype=np.int32),
+        'float32': np.ones((2, 3), dtype=np.float32),
+        'bool': np.array([True, False]),
+        'str': np.array(['ab', 'cde']),
+        'complex': np.array([1 + 2j]),
+        'scalar': np.array(3.5),
+        'empty': np.zeros((0, 4)),
+        'fortran': np.asfortranarray(np.random.rand(3, 4)),
+        'strided': np.random.rand(6, 6)[::2, 1:],
+    }
+    ts = ktk.TimeSeries(time=np.arange(10, dtype=np.float32))
+    ts.data['int'] = np.arange(20, dtype=np.int16).reshape(10, 2)
+    a['ts'] = ts
+
+    ktk.save(filename, a)
+    b = ktk.load(filename)
+
+    for key in a:
+        if key == 'ts':
+            continue
+        assert b[key].dtype == a[key].dtype
+        assert b[key].shape == a[key].shape
+        assert np.array_equal(b[key], a[key])
+    assert b['ts'].time.dtype == np.float32
+    assert b['ts'].data['int'].dtype == np.int16
+    assert np.array_equal(b['ts'].data['int'], ts.data['int'])
+
+
+def test_load_fileformat_1():
+    """Test that archives with arrays saved as lists can still be read."""
+    ts = ktk.load(ktk.config.root_folder +
+                  '/data/filters/sample_noisy.ktk.zip')
+    assert isinstance(ts, ktk.TimeSeries)
+    assert ts.time.shape[0] == ts.data['sine'].shape[0]
+
+
+def test_load_lazy(tmp_path):
+    """Test that lazy loading gives the same contents as normal loading."""
+    filename = str(tmp_path / 'test.ktk.zip')
+    ts = ktk.TimeSeries(time=np.arange(100) / 10)
+    ts.data['signal1'] = np.random.rand(100, 4)
+    ts.data['signal2'] = np.random.rand(100)
+    ts.add_data_info('signal1', 'Unit', 'm')
+    ts.add_event(1.5, 'event')
+    a = {'trials': {'trial1': ts, 'trial2': ts.copy()},
+         'list': [1, 'two', np.arange(3), {'key': None}],
+         'complex': 1 + 2j,
+         'dataframe': ts.to_dataframe()}
+    ktk.save(filename, a)
+
+    b = ktk.load(filename, lazy=True)
+    assert len(b) == len(a)
+    assert list(b['trials']) == ['trial1', 'trial2']
+    assert b['trials']['trial2'] == ts
+    assert b['list'][0] == 1
+    assert b['list'][1] == 'two'
+    assert np.all(b['list'][2] == np.arange(3))
+    assert b['list'][3]['key'] is None
+    assert b['complex'] == 1 + 2j
+    pd.testing.assert_frame_equal(b['dataframe'], a['dataframe'])
+
+    # Decoded arrays are read-only, but copies are normal objects.
+    assert not b['trials']['trial1'].data['signal1'].flags.writeable
+    ts2 = b['trials']['trial1'].copy()
+    assert isinstance(ts2.data, dict)
+    ts2.data['signal1'][0, 0] = 2
+    assert ts2.data['signal1'][0, 0] == 2
+
+    # Assigned values are kept.
+    b['trials']['trial1'].data['signal3'] = np.zeros(100)
+    assert np.all(b['trials']['trial1'].data['signal3'] == 0)
+
+    # Evicted values are decoded again.
+    c = ktk.load(filename, lazy=True, cache_size=0)
+    assert np.all(c['trials']['trial1'].data['signal1'] ==
+                  ts.data['signal1'])
+    assert np.all(c['trials']['trial2'].data['signal2'] ==
+                  ts.data['signal2'])
+
+    # Modifications to containers and TimeSeries are never evicted.
+    c['trials']['new'] = 5
+    c['list'].append(3)
+    c['list'][3]['key'] = 'value'
+    c['trials']['trial1'].data['signal3'] = np.zeros(100)
+    c['trials']['trial1'].add_event(2.0, 'new_event')
+    c['trials']['trial1'].time_info['Unit'] = 'ms'
+    for key in ['trial1', 'trial2']:  # Fill the cache
+        c['trials'][key].data['signal1']
+        c['trials'][key].data['signal2']
+    assert c['trials']['new'] == 5
+    assert c['list'][4] == 3
+    assert c['list'][3]['key'] == 'value'
+    assert np.all(c['trials']['trial1'].data['signal3'] == 0)
+    assert c['trials']['trial1'].events[-1].name == 'new_event'
+    assert c['trials']['trial1'].time_info['Unit'] == 'ms'
+
+    # Lazily loaded variables can be saved back.
+    filename2 = str(tmp_path / 'test2.ktk.zip')
+    ktk.save(filename2, c)
+    d = ktk.load(filename2)
+    assert isinstance(d, dict)
+    assert isinstance(d['list'], list)
+    assert d['list'][:2] == [1, 'two']
+    assert d['list'][3:] == [{'key': 'value'}, 3]
+    assert d['trials']['new'] == 5
+    assert d['trials']['trial1'] == c['trials']['trial1']
+    assert d['trials']['trial2'] == ts
+    assert d['complex'] == 1 + 2j
+    pd.testing.assert_frame_equal(d['dataframe'], a['dataframe'])
+
+
+def test_save_load_memory_map(tmp_path):
+    """Test memory-mapped arrays in uncompressed ktk.zip files."""
+    filename = str(tmp_path / 'test.ktk.zip')
+    ts = ktk.TimeSeries(time=np.arange(100) / 10)
+    ts.data['signal1'] = np.random.rand(100, 4)
+    ts.data['signal2'] = np.asfortranarray(np.random.rand(100, 3))
+    a = {'ts': ts, 'int': np.arange(7, dtype=np.int16), 'empty': np.zeros(0)}
+
+    ktk.save(filename, a, memory_map=True)
+
+    for lazy in [False, True]:
+        b = ktk.load(filename, memory_map=True, lazy=lazy)
+        assert b['ts'] == ts
+        assert isinstance(b['int'], np.memmap)
+        assert b['int'].dtype == np.int16
+        assert np.all(b['int'] == np.arange(7))
+        assert b['empty'].shape == (0,)
+        assert not b['ts'].data['signal1'].flags.writeable
+
+    # Memory-mapping a compressed archive reads the arrays normally.
+    ktk.save(filename, a)
+    b = ktk.load(filename, memory_map=True)
+    assert b['ts'] == ts
+    assert not isinstance(b['int'], np.memmap)
+
+
+def test_save_compression(tmp_path):
+    """Test the compression methods and the atomic write."""
+    filename = str(tmp_path / 'test.ktk.zip')
+    ts = ktk.TimeSeries(time=np.arange(1000) / 100)
+    ts.data['signal'] = np.zeros((1000, 4))
+    a = {'ts': ts, 'str': 'test'}
+
+    sizes = {}
+    for compression in ['stored', 'deflate', 'lzma']:
+        ktk.save(filename, a, compression=compression)
+        sizes[compression] = os.path.getsize(filename)
+        b = ktk.load(filename)
+        assert b['ts'] == ts
+        assert b['str'] == 'test'
+    assert sizes['deflate'] < sizes['stored']
+
+    ktk.save(filename, a, compression='deflate', compresslevel=1)
+    assert ktk.load(filename)['ts'] == ts
+
+    # New files follow the umask, and existing files keep their mode.
+    if os.name == 'posix':
+        umask = os.umask(0)
+        os.umask(umask)
+        os.remove(filename)
+        ktk.save(filename, a)
+        assert (os.stat(filename).st_mode & 0o777 ==
+                0o666 & ~umask)
+        os.chmod(filename, 0o640)
+        ktk.save(filename, a)
+        assert os.stat(filename).st_mode & 0o777 == 0o640
+
+    # A failed save leaves the original file intact and no temp files.
+    try:
+        ktk.save(filename, a, compression='bzip3')
+        raise AssertionError('This should fail.')
+    except ValueError:
+        pass
+    try:
+        ktk.save(filename, {'unsupported': object()})
+        raise AssertionError('This should fail.')
+    except TypeError:
+        pass
+    assert ktk.load(filename)['ts'] == ts
+    assert not [_ for _ in os.listdir(tmp_path) if _.endswith('.tmp')]
+
+
+def _write_legacy_file(filename):
+    """Write a legacy ktk.zip file (without data.json) by hand."""
+    import csv
+    import zipfile
+
+    def to_csv(dataframe, **kwargs):
+        return dataframe.to_csv(sep='\t', quoting=csv.QUOTE_NONNUMERIC,
+                                **kwargs)
+
+    data = pd.DataFrame({'time': [0.0, 0.1, 0.2],
+                         'Forces[0]': [1.0, 2.0, 3.0],
+                         'Forces[1]': [4.0, 5.0, 6.0],
+                         'Other': [7.0, 8.0, 9.0]})
+    events = pd.DataFrame({'time': [0.1, 0.0], 'name': ['push', 'start']})
+    info = pd.DataFrame({'time': ['s', None],
+                         'Forces': ['N', 'red'],
+                         'Other': [None, None]},
+                        index=['Unit', 'Color'])
+    array = pd.DataFrame({'Data[0]': [1.0, 2.0], 'Data[1]': [3.0, 4.0]})
+
+    with zipfile.ZipFile(filename, 'w') as archive:
+        archive.writestr('metadata.dict/Author.str.txt', 'someone')
+        root = 'contents.dict/'
+        archive.writestr(root + 'ts.TimeSeries/data.txt',
+                         to_csv(data, index=False))
+        archive.writestr(root + 'ts.TimeSeries/events.txt',
+                         to_csv(events, index=False))
+        archive.writestr(root + 'ts.TimeSeries/info.txt', to_csv(info))
+        archive.writestr(root + 'items.list/1.eval.txt', '[1, 2.5]')
+        archive.writestr(root + 'items.list/0.str.txt', 'first')
+        archive.writestr(root + 'items.list/10.str.txt', 'last')
+        for i in range(2, 10):
+            archive.writestr(root + f'items.list/{i}.eval.txt', str(i))
+        archive.writestr(root + 'pair.tuple/0.eval.txt', '1')
+        archive.writestr(root + 'pair.tuple/1.eval.txt', '2')
+        archive.writestr(root + 'array.ndarray.txt',
+                         to_csv(array, index=False))
+        archive.writestr(root + 'empty.dict/', '')
+
+
+def test_load_legacy(tmp_path):
+    """Test loading legacy ktk.zip files and converting them."""
+    def check(b, pair):
+        assert b['ts'].time.tolist() == [0.0, 0.1, 0.2]
+        assert b['ts'].data['Forces'].tolist() == [[1, 4], [2, 5], [3, 6]]
+        assert b['ts'].data['Other'].tolist() == [7, 8, 9]
+        assert b['ts'].events == [ktk.TimeSeriesEvent(0.1, 'push'),
+                                  ktk.TimeSeriesEvent(0.0, 'start')]
+        assert b['ts'].time_info == {'Unit': 's'}
+        assert b['ts'].data_info == {'Forces': {'Unit': 'N',
+                                                'Color': 'red'}}
+        assert b['items'] == ['first', [1, 2.5], 2, 3, 4, 5, 6, 7, 8, 9,
+                              'last']
+        assert b['pair'] == pair
+        assert b['array'].tolist() == [[1, 3], [2, 4]]
+        assert b['empty'] == {}
+
+    folder = str(tmp_path / 'test_legacy')
+    os.makedirs(os.path.join(folder, 'sub'))
+    legacy_filename = os.path.join(folder, 'sub', 'legacy.ktk.zip')
+    _write_legacy_file(legacy_filename)
+    check(ktk.load(legacy_filename), (1, 2))
+
+    ktk.save(os.path.join(folder, 'current.ktk.zip'), {'a': 1})
+    converted = ktk.loadsave.upgrade_legacy_files(folder, workers=2)
+    assert converted == [legacy_filename]
+    # Tuples are saved as lists in the current format.
+    check(ktk.load(legacy_filename), [1, 2])
+    assert ktk.loadsave.upgrade_legacy_files(folder) == []
+
+
+def test_load_many(tmp_path):
+    """Test reading many files concurrently."""
+    filenames = []
+    for i in range(4):
+        filenames.append(str(tmp_path / f'test_load_many{i}.ktk.zip'))
+        ktk.save(filenames[-1], {'index': i})
+    filenames.insert(2, str(tmp_path / 'nonexistent.ktk.zip'))
+    filenames.append(str(tmp_path / 'unsupported.xyz'))
+
+    for processes in [False, True]:
+        results = list(ktk.load_many(filenames, workers=3,
+                                     processes=processes))
+        assert [_.filename for _ in results] == filenames
+        assert [_.contents for _ in results] == [
+            {'index': 0}, {'index': 1}, None, {'index': 2}, {'index': 3},
+            None]
+        assert isinstance(results[2].error, FileNotFoundError)
+        assert isinstance(results[5].error, ValueError)
+        assert all(_.duration >= 0 for _ in results)
+
+    results = list(ktk.load_many(filenames, workers=3, ordered=False))
+    assert sorted(_.filename for _ in results) == sorted(filenames)
+
+    results = list(ktk.load_many(filenames[0:1], reader=os.path.getsize))
+    assert results[0].contents == os.path.getsize(filenames[0])
+
+
 if __name__ == "__main__":
     import pytest
     pytest.main([__file__])
@@ -51,6 +51,72 @@ def test_read_csv_txt_file():
                   kinetics_txt.data['Angle'][0:smaller]) < 1E-4
 
 
+def test_read_file_chunks():
+    """Test that reading a SmartWheel txt file by chunks is consistent."""
+    filename_txt = (ktk.config.root_folder +
+                    '/data/pushrimkinetics/sample_sw_csvtxt.TXT')
+    kinetics = ktk.pushrimkinetics.read_file(
+        filename_txt, file_format='smartwheeltxt')
+    kinetics_mmap = ktk.pushrimkinetics.read_file(
+        filename_txt, file_format='smartwheeltxt', memory_map=True)
+
+    assert np.all(kinetics.data['Channels'] ==
+                  kinetics_mmap.data['Channels'])
+    assert np.all(kinetics.data['Angle'] == kinetics_mmap.data['Angle'])
+
+    chunks = list(ktk.pushrimkinetics.read_file_chunks(
+        filename_txt, 'smartwheeltxt', chunk_size=1000))
+
+    assert np.all(np.concatenate(
+        [chunk.data['Channels'] for chunk in chunks]) ==
+        kinetics.data['Channels'])
+    assert np.all(np.concatenate(
+        [chunk.data['Angle'] for chunk in chunks]) ==
+        kinetics.data['Angle'])
+    assert chunks[1].time[0] == kinetics.time[1000]
+    assert np.all(np.concatenate([chunk.time for chunk in chunks]) ==
+                  kinetics.time)
+
+
+def test_read_file_chunks_truncated(tmp_path):
+    """Test SmartWheel txt files that end with a truncated record."""
+    record_size = ktk.pushrimkinetics._SMARTWHEELTXT_RECORD.itemsize
+    with open(ktk.config.root_folder +
+              '/data/pushrimkinetics/sample_sw_csvtxt.TXT', 'rb') as fid:
+        contents = fid.read(record_size * 2000 + 20)  # Keeps the last angle
+    filename_txt = str(tmp_path / 'truncated.TXT')
+    with open(filename_txt, 'wb') as fid:
+        fid.write(contents)
+
+    (records, tail) = ktk.pushrimkinetics._read_smartwheeltxt_records(
+        filename_txt, memory_map=True)
+    assert isinstance(records, np.memmap)
+    assert records.shape[0] == 2000
+    assert tail.shape[0] == 1
+    del records
+
+    kinetics = ktk.pushrimkinetics.read_file(
+        filename_txt, file_format='smartwheeltxt')
+    kinetics_mmap = ktk.pushrimkinetics.read_file(
+        filename_txt, file_format='smartwheeltxt', memory_map=True)
+    assert kinetics.time.shape[0] == 2000
+    assert kinetics_mmap == kinetics
+
+    for chunk_size in [999, 1000]:  # Tail alone or with other records
+        chunks = list(ktk.pushrimkinetics.read_file_chunks(
+            filename_txt, 'smartwheeltxt', chunk_size=chunk_size))
+        assert [chunk.time.shape[0] for chunk in chunks[:2]] == [
+            chunk_size, chunk_size]
+        assert np.all(np.concatenate(
+            [chunk.data['Channels'] for chunk in chunks]) ==
+            kinetics.data['Channels'])
+        assert np.all(np.concatenate(
+            [chunk.data['Angle'] for chunk in chunks]) ==
+            kinetics.data['Angle'])
+        assert np.all(np.concatenate([chunk.time for chunk in chunks]) ==
+                      kinetics.time)
+
+
 def test_remove_offsets():
     """Test that remove_offsets works with and without a baseline."""
     kinetics = ktk.pushrimkinetics.read_file(
@@ -77,6 +143,32 @@ def test_remove_offsets():
                          no_offsets2.data['Moments']) < 0.1)
 
 
+def test_find_recovery_indices():
+    """Test against the original argsort-based algorithm."""
+    def reference(Mz):
+        Mz = Mz.copy()
+        while np.nanmax(Mz) - np.nanmin(Mz) > 2.24:
+            index_to_remove = np.argsort(np.abs(Mz - np.nanmedian(Mz)))
+            sorted_Mz = Mz[index_to_remove]
+            index_to_remove = index_to_remove[~np.isnan(sorted_Mz)]
+            index_to_remove = index_to_remove[
+                int(0.99*len(index_to_remove))-1:]
+            Mz[index_to_remove] = np.nan
+        return ~np.isnan(Mz)
+
+    np.random.seed(0)
+    for n_samples in [1, 2, 3, 50, 1000, 10000]:
+        Mz = 10 * np.random.randn(n_samples)
+        Mz[np.random.rand(n_samples) < 0.1] = np.nan
+        assert np.array_equal(
+            ktk.pushrimkinetics.find_recovery_indices(Mz), reference(Mz))
+
+    # Recovery values remain within tolerance
+    Mz = 10 * np.random.randn(1000)
+    index = ktk.pushrimkinetics.find_recovery_indices(Mz)
+    assert np.max(Mz[index]) - np.min(Mz[index]) <= 2.24
+
+
 def test_calculate_forces_and_moments():
     """Test that force calculation is similar to precalculated forces."""
     kinetics = ktk.pushrimkinetics.read_file(
@@ -104,6 +196,37 @@ def test_calculate_forces_and_moments():
                        np.std(np.abs(kinetics.data['Moments']), axis=0),
                        atol=2)
 
+    # Single precision should give the same results, up to float32 precision
+    test32 = ktk.pushrimkinetics.calculate_forces_and_moments(
+        kinetics,
+        **ktk.pushrimkinetics.CALIBRATION_MATRICES['SmartWheel_123'],
+        reference_frame='hub',
+        dtype=np.float32)
+    assert test32.data['Forces'].dtype == np.float32
+    assert np.allclose(test32.data['Forces'], test.data['Forces'], atol=1E-2)
+    assert np.allclose(test32.data['Moments'], test.data['Moments'],
+                       atol=1E-2)
+
+    # Force cell calibration matrix applied on all frames at once
+    test = ktk.pushrimkinetics.calculate_forces_and_moments(
+        kinetics,
+        **ktk.pushrimkinetics.CALIBRATION_MATRICES['MSA_Racing_1'])
+    gains = ktk.pushrimkinetics.CALIBRATION_MATRICES['MSA_Racing_1']['gains']
+    offsets = ktk.pushrimkinetics.CALIBRATION_MATRICES[
+        'MSA_Racing_1']['offsets']
+    for i_frame in [0, 100, len(kinetics.time) - 1]:
+        expected = gains @ kinetics.data['Channels'][i_frame] + offsets
+        assert np.allclose(test.data['Forces'][i_frame, 0:3], expected[0:3])
+        assert np.allclose(test.data['Moments'][i_frame, 0:3], expected[3:6])
+
+    # Unknown transducers are refused
+    try:
+        ktk.pushrimkinetics.calculate_forces_and_moments(
+            kinetics, gains, offsets, transducer='forcecell')
+        raise AssertionError('This should fail.')
+    except ValueError:
+        pass
+
 
 if __name__ == "__main__":
     import pytest
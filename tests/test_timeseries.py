@@ -28,6 +28,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 import warnings
+import pickle
+from copy import deepcopy
 
 
 def test_TimeSeriesEvent():
@@ -90,6 +92,44 @@ def test_empty_constructor():
     assert ts.time_info['Unit'] == 's'
 
 
+def test_digest_and_eq():
+    """Test TimeSeries.digest and the equality of TimeSeries."""
+    ts1 = ktk.TimeSeries(time=np.arange(10.0))
+    ts1.data['Data0'] = np.arange(10.0)
+    ts1.data['Data1'] = np.asfortranarray(np.random.rand(10, 3))
+    ts1.add_event(1.0, 'event')
+    ts1.add_data_info('Data0', 'Unit', 'm')
+
+    ts2 = ktk.TimeSeries(time=np.arange(10.0))
+    ts2.data['Data1'] = ts1.data['Data1'].copy()  # Other order and layout
+    ts2.data['Data0'] = np.arange(10.0)
+    ts2.add_event(1.0, 'event')
+    ts2.add_data_info('Data0', 'Unit', 'm')
+    assert ts1 == ts2
+    assert ts1.digest() == ts2.digest()
+    assert len(ts1.digest()) == 40
+
+    # Any change modifies the digest
+    for modify in [
+            lambda ts: ts.data['Data0'].__setitem__(0, -1.0),
+            lambda ts: ts.data.__setitem__('Data2', np.zeros(10)),
+            lambda ts: ts.add_event(2.0),
+            lambda ts: ts.rename_event('event', 'other'),
+            lambda ts: ts.add_data_info('Data1', 'Unit', 'N'),
+            lambda ts: ts.time_info.__setitem__('Unit', 'ms'),
+            lambda ts: ts.shift(1.0)]:
+        ts3 = ts1.copy()
+        modify(ts3)
+        assert ts3.digest() != ts1.digest()
+        assert ts3 != ts1
+
+    # The digest is bit for bit, while __eq__ compares values.
+    ts3 = ts1.copy()
+    ts3.data['Data0'] = np.arange(10)
+    assert ts3 == ts1
+    assert ts3.digest() != ts1.digest()
+
+
 def test_from_dataframe():
     df = pd.DataFrame(columns=['Data0', 'Data1[0,0]', 'Data1[0,1]',
                                'Data1[1,0]', 'Data1[1,1]'])
@@ -199,6 +239,12 @@ def test_rename_event():
         "TimeSeriesEvent(time=2.3, name='event4')]"
     )
 
+    # Events with a nan time are not renamed
+    ts.add_event(np.nan, 'event3')
+    ts.rename_event('event3', 'event5')
+    assert [event.name for event in ts.events] == [
+        'event1', 'event5', 'event4', 'event3']
+
 
 def test_remove_event():
     # Original doctest
@@ -227,6 +273,12 @@ def test_remove_event():
         ts.remove_event('event2', 10)
     assert str(ts.events) == "[TimeSeriesEvent(time=2.3, name='event2')]"
 
+    # Events with a nan time are not removed
+    ts.add_event(np.nan, 'event2')
+    ts.remove_event('event2')
+    assert len(ts.events) == 1
+    assert np.isnan(ts.events[0].time)
+
 
 def test_sort_events():
     # Original doctest
@@ -260,6 +312,30 @@ def test_get_event_time():
     assert ts.get_event_time('event2', 1) == 10.8
 
 
+def test_add_events_get_event_times():
+    ts = ktk.TimeSeries(time=np.arange(100) / 10)
+    ts.add_events(np.array([5.0, 1.0, 3.0]), 'push')
+    ts.add_events([2.0, 4.0, np.nan], ['recovery', 'recovery', 'push'])
+    ts.add_event(1.0, 'push')
+    assert len(ts.events) == 7
+    assert np.all(ts.get_event_times('push') == [1.0, 1.0, 3.0, 5.0])
+    assert np.all(ts.get_event_times('recovery') == [2.0, 4.0])
+    assert ts.get_event_times('other').shape == (0,)
+
+    # Equal times keep their order in the events list
+    assert ts.get_event_index('push', 0) == 1
+    assert ts.get_event_index('push', 1) == 6
+    assert ts.get_event_index('push', 3) == 0
+    assert np.isnan(ts.get_event_index('push', 4))
+    assert ts.get_event_time('recovery', 1) == 4.0
+
+    try:
+        ts.add_events([1.0, 2.0], ['one'])
+        raise AssertionError('This should fail.')
+    except ValueError:
+        pass
+
+
 def test_get_ts_at_event___get_ts_at_time():
     ts = ktk.TimeSeries()
     ts.time = np.linspace(0, 99, 100)
@@ -279,6 +355,90 @@ def test_get_ts_at_event___get_ts_at_time():
     assert new_ts.time == 11
 
 
+def test_get_index_at_before_after_time():
+    for read_only in [False, True]:  # Analysis is cached if read-only
+        for time in [
+                np.arange(10) / 10,  # Uniform
+                np.array([0, 0.1, 0.1, 0.25, 0.4, 0.4, 0.7, 0.9]),  # Sorted
+                np.array([0.5, 0.1, 0.9, 0.2, 0, 0.7])]:  # Unsorted
+            ts = ktk.TimeSeries(time=time)
+            ts.time.flags.writeable = not read_only
+            queries = [-1, 0, 0.05, 0.1, 0.15, 0.4, 0.85, 0.9, 2, np.nan]
+            for inclusive in [False, True]:
+                before = ts.get_index_before_time(queries,
+                                                  inclusive=inclusive)
+                after = ts.get_index_after_time(queries,
+                                                inclusive=inclusive)
+                for i, query in enumerate(queries):
+                    # Vectorized and scalar lookups are equivalent
+                    assert np.array_equal(
+                        before[i],
+                        ts.get_index_before_time(query, inclusive=inclusive),
+                        equal_nan=True)
+                    assert np.array_equal(
+                        after[i],
+                        ts.get_index_after_time(query, inclusive=inclusive),
+                        equal_nan=True)
+                    if inclusive:
+                        continue
+                    # Compare with a full scan
+                    expected_before = expected_after = np.nan
+                    if np.any(time < query):
+                        expected_before = np.argmax(
+                            np.where(time < query, time, -np.inf))
+                    if np.any(time > query):
+                        expected_after = np.argmin(
+                            np.where(time > query, time, np.inf))
+                    assert np.array_equal(before[i], expected_before,
+                                          equal_nan=True)
+                    assert np.array_equal(after[i], expected_after,
+                                          equal_nan=True)
+
+            at = ts.get_index_at_time(queries[:-1])
+            assert at.dtype == int
+            for i, query in enumerate(queries[:-1]):
+                assert at[i] == np.argmin(np.abs(time - query))
+                assert ts.get_index_at_time(query) == at[i]
+
+    # The analysis of time is updated when time changes.
+    ts = ktk.TimeSeries(time=np.arange(10) / 10)
+    assert ts.get_index_at_time(0.52) == 5
+    assert np.all(ts.get_index_at_time([0.52]) == 5)
+    ts.time *= 10
+    assert ts.get_index_at_time(5.2) == 5
+    ts.time = ts.time[::-1]
+    assert ts.get_index_at_time(5.2) == 4
+    ts.time = np.arange(10.0)
+    assert ts.get_index_at_time(8.4) == 8
+    assert ts.is_uniform
+    ts.time[5] = 8.4  # Modified in place
+    assert ts.get_index_at_time(8.4) == 5
+    assert np.all(ts.get_index_at_time([8.4]) == 5)
+    assert not ts.is_uniform
+
+    # Read-only views of writeable arrays are updated too
+    time = np.arange(10.0)
+    ts.time = time[:]
+    ts.time.flags.writeable = False
+    assert ts.get_index_at_time(8.4) == 8
+    assert ts.is_uniform
+    time[5] = 8.4
+    assert ts.get_index_at_time(8.4) == 5
+    assert not ts.is_uniform
+
+    # The analysis of writeable time is cached, so that lookups use
+    # searchsorted instead of scanning time.
+    ts = ktk.TimeSeries(time=np.arange(100000) / 100)
+    assert ts.time.flags.writeable
+    assert ktk.timeseries._get_cached_time_analysis(ts.time) is None
+    assert ts.get_index_at_time(500.004) == 50000
+    assert ktk.timeseries._get_cached_time_analysis(ts.time) == 'uniform'
+    ts.time[-1] = 999.985  # Modified in place
+    assert ktk.timeseries._get_cached_time_analysis(ts.time) is None
+    assert ts.get_index_before_time(999.986) == 99999
+    assert ktk.timeseries._get_cached_time_analysis(ts.time) == 'increasing'
+
+
 def test_get_ts_before_time():
     ts = ktk.TimeSeries(time=np.linspace(0, 9, 10))
     new_ts = ts.get_ts_before_time(0)
@@ -306,6 +466,39 @@ def test_get_ts_between_times():
     assert new_ts.time.tolist() == [4., 5., 6., 7., 8.]
 
 
+def test_get_ts_copy():
+    ts = ktk.TimeSeries(time=np.arange(100) / 10)
+    ts.data['data1'] = np.random.rand(100, 3)
+    ts.add_event(2.0, 'event')
+    ts.add_event(5.0, 'event')
+    ts.add_data_info('data1', 'Unit', 'm')
+
+    for copy in [True, False]:
+        subsets = [ts.get_ts_between_times(2.0, 5.0, copy=copy),
+                   ts.get_ts_between_events('event', 'event', 0, 1,
+                                            copy=copy),
+                   ts.get_ts_between_indexes(20, 50, copy=copy),
+                   ts.get_ts_before_time(5.0, copy=copy),
+                   ts.get_ts_after_event('event', copy=copy)]
+        for subset in subsets:
+            assert np.shares_memory(subset.data['data1'],
+                                    ts.data['data1']) == (not copy)
+            assert np.shares_memory(subset.time, ts.time) == (not copy)
+
+            # Modifying the events and info never modifies the original
+            subset.shift(1.0)
+            subset.add_data_info('data1', 'Unit', 'mm')
+            subset.time_info['Unit'] = 'ms'
+            assert ts.events[0].time == 2.0
+            assert ts.data_info['data1']['Unit'] == 'm'
+            assert ts.time_info['Unit'] == 's'
+
+    # Views on the data
+    subset = ts.get_ts_between_indexes(20, 50, copy=False)
+    subset.data['data1'][0] = -1
+    assert np.all(ts.data['data1'][21] == -1)
+
+
 def test_merge_and_resample():
     # Begin with two timeseries with identical times
     ts1 = ktk.TimeSeries()
@@ -446,6 +639,203 @@ def test_plot():
     plt.close(fig)
 
 
+def test_is_uniform_sampling_rate():
+    ts = ktk.TimeSeries(time=np.arange(1000) / 100 + 5)
+    assert ts.is_uniform
+    assert np.isclose(ts.sampling_rate, 100)
+
+    # Views and copies are also uniform
+    assert ts.get_ts_between_times(6, 7, copy=False).is_uniform
+    assert ts.copy().sampling_rate == ts.sampling_rate
+
+    # The analysis is cached, and given to copies
+    analysis = ktk.timeseries._get_cached_time_analysis
+    assert analysis(ts.time) == 'uniform'
+    copy_on_write = ktk.config.copy_on_write
+    try:
+        for ktk.config.copy_on_write in [False, True]:
+            assert analysis(ts.copy().time) == 'uniform'
+    finally:
+        ktk.config.copy_on_write = copy_on_write
+    assert analysis(ktk.filters.smooth(ts, 3).time) == 'uniform'
+
+    # Reassigning or changing the time vector is detected
+    ts.time = ts.time ** 2
+    assert not ts.is_uniform
+    assert np.isnan(ts.sampling_rate)
+    ts.time = np.arange(10.0)
+    assert ts.sampling_rate == 1.0
+    ts.time[-1] = 20.0
+    assert not ts.is_uniform
+
+    # Nans, single samples and empty TimeSeries are not uniform
+    ts.time = np.array([0.0, np.nan, 2.0])
+    assert not ts.is_uniform
+    ts.time = np.array([0.0])
+    assert not ts.is_uniform
+    assert not ktk.TimeSeries().is_uniform
+
+
+def test_isnan_gap_report():
+    ts = ktk.TimeSeries(time=np.arange(10) / 10)
+    ts.data['data1'] = np.zeros((10, 2, 3))
+    ts.data['data1'][[0, 1, 4], 1, 2] = np.nan
+    ts.data['data1'][9, 0, 0] = np.nan
+    ts.data['data2'] = np.arange(10.0)
+
+    assert np.all(ts.isnan('data1') ==
+                  [1, 1, 0, 0, 1, 0, 0, 0, 0, 1])
+    assert not np.any(ts.isnan('data2'))
+
+    # The returned mask is not shared, and in-place modifications are seen
+    ts.isnan('data2')[0] = True
+    ts.data['data2'][3] = np.nan
+    assert np.all(ts.isnan('data2') == (np.arange(10) == 3))
+
+    report = ts.gap_report()
+    assert list(report.index) == ['data1', 'data2']
+    assert list(report.loc['data1']) == [4, 3, 2, 0.0, 0.1]
+    assert list(report.loc['data2']) == [1, 1, 1, 0.3, 0.3]
+
+    # Modifications through the base of read-only views are seen
+    values = np.zeros(10)
+    ts.data['data3'] = values[:]
+    ts.data['data3'].flags.writeable = False
+    assert not np.any(ts.isnan('data3'))
+    values[3] = np.nan
+    assert np.all(ts.isnan('data3') == (np.arange(10) == 3))
+
+
+def test_fill_missing_samples():
+    ts = ktk.TimeSeries(time=np.arange(10.0))
+    ts.data['data1'] = np.arange(10.0)
+    ts.data['data1'][[0, 1, 3, 6, 7, 8]] = np.nan
+    ts.data['data2'] = np.arange(10.0).reshape(10, 1, 1) * np.ones((1, 3, 2))
+    ts.data['data2'][[0, 1, 3, 6, 7, 8], 1, 1] = np.nan
+    ts.data['data3'] = np.arange(10.0) ** 2
+    original = ts.data['data1'].copy()
+
+    # Fill everything, with extrapolation
+    ts1 = ts.copy()
+    ts1.fill_missing_samples(0)
+    assert np.allclose(ts1.data['data1'], np.arange(10.0))
+    assert np.allclose(ts1.data['data2'],
+                       np.arange(10.0).reshape(10, 1, 1) * np.ones((1, 3, 2)))
+    assert np.all(ts1.data['data3'] == ts.data['data3'])
+    # The original arrays have not been modified
+    assert np.array_equal(ts.data['data1'], original, equal_nan=True)
+
+    # Holes longer than max_missing_samples are kept missing
+    ts2 = ts.copy()
+    ts2.fill_missing_samples(2)
+    expected = np.arange(10.0)
+    expected[[6, 7, 8]] = np.nan
+    assert np.allclose(ts2.data['data1'], expected, equal_nan=True)
+    assert np.all(np.isnan(ts2.data['data2'][6:9]))  # The whole samples
+    assert not np.any(np.isnan(ts2.data['data2'][0:6]))
+    assert not np.any(np.isnan(ts2.data['data2'][9]))
+
+    ts2 = ts.copy()
+    ts2.fill_missing_samples(1)
+    expected[[0, 1]] = np.nan
+    assert np.allclose(ts2.data['data1'], expected, equal_nan=True)
+
+    # Other methods
+    ts3 = ts.copy()
+    ts3.fill_missing_samples(0, method='nearest')
+    assert ts3.data['data1'][8] == 9.0
+    ts3 = ts.copy()
+    ts3.fill_missing_samples(0, method='pchip')
+    assert np.allclose(ts3.data['data1'], np.arange(10.0))
+
+
+def test_copy_on_write():
+    ts = ktk.TimeSeries(time=np.arange(100) / 10)
+    ts.data['data1'] = np.random.rand(100, 3)
+    ts.data['data2'] = np.array(['a'] * 100, dtype=object)
+    ts.add_event(2.0, 'event')
+    ts.data_info['data1'] = {'Unit': 'm'}
+
+    copy_on_write = ktk.config.copy_on_write
+    try:
+        # Default: everything is duplicated
+        ktk.config.copy_on_write = False
+        ktk.timeseries.get_copy_statistics(reset=True)
+        ts2 = ts.copy()
+        assert ts2 == ts
+        assert not np.shares_memory(ts2.data['data1'], ts.data['data1'])
+        stats = ktk.timeseries.get_copy_statistics()
+        assert stats['shared'] == 0
+        assert stats['duplicated'] == (
+            ts.time.nbytes + ts.data['data1'].nbytes + ts.data['data2'].nbytes)
+
+        # Copy-on-write: numeric arrays are shared until they are accessed
+        ktk.config.copy_on_write = True
+        original = np.array(ts.data['data1'])
+        array = ts.data['data1']
+        ktk.timeseries.get_copy_statistics(reset=True)
+        ts2 = ts.copy()
+        assert ktk.timeseries.get_copy_statistics(reset=True) == {
+            'shared': original.nbytes,
+            'duplicated': ts2.time.nbytes + ts2.data['data2'].nbytes}
+        assert ts2.time is not ts.time
+        assert ts2.events[0] is not ts.events[0]
+        assert ts2.data_info['data1'] is not ts.data_info['data1']
+
+        # A reference obtained before the copy cannot modify it
+        try:
+            array[0] = 0
+            raise AssertionError('The array should be read-only.')
+        except ValueError:
+            pass
+
+        # The first TimeSeries to access a shared array gets a copy, the
+        # last one gets the array back.
+        ts2.data['data1'][0] = 0
+        assert np.all(ts.data['data1'] == original)
+        assert ts.data['data1'] is array
+        ts.data['data1'][1] = 0
+        assert np.all(ts2.data['data1'][1] == original[1])
+        assert ts2 != ts
+        assert ktk.timeseries.get_copy_statistics(reset=True) == {
+            'shared': 0, 'duplicated': original.nbytes}
+
+        # A deleted copy does not hold the array anymore
+        ts3 = ts.copy()
+        del ts3
+        ts.data['data1'][0] = 1
+        assert ts.data['data1'] is array
+        assert ktk.timeseries.get_copy_statistics()['duplicated'] == (
+            ts.time.nbytes + ts.data['data2'].nbytes)
+
+        # Views of writeable arrays are copied
+        window = ts.get_ts_between_times(2, 5, copy=False)
+        window_copy = window.copy()
+        ts.data['data1'][30] = -1
+        assert np.any(window.data['data1'] == -1)
+        assert np.all(window_copy.data['data1'] >= 0)
+
+        # Read-only arrays are copied by the copy when it accesses them
+        ts.data['data3'] = np.zeros(100)
+        ts.data['data3'].flags.writeable = False
+        ts4 = ts.copy()
+        ts4.data['data3'][0] = 1
+        assert ts.data['data3'][0] == 0
+        assert not ts.data['data3'].flags.writeable
+
+        # Copies of copies, deep copies and pickling
+        ts5 = ts.copy()
+        ts6 = ts5.copy()
+        ts5.data['data1'][0] = 5
+        assert deepcopy(ts6) == ts
+        assert pickle.loads(pickle.dumps(ts6)) == ts
+        assert isinstance(deepcopy(ts6).data, dict)
+        assert np.all(ts6.data['data1'][0] == 1)
+
+    finally:
+        ktk.config.copy_on_write = copy_on_write
+
+
 if __name__ == "__main__":
     import pytest
     pytest.main([__file__])